@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Batch position analysis: FEN lines in, one JSON object per position out
+
+import json
+import sys
+import time
+
+import chess
+from workers import imap_bounded
+
+
+def analyze_position(fen, use_bitboard=False):
+    """Check, game status (mate, stalemate, fifty-move draw) and the legal moves of the side to move"""
+    try:
+        board, rules = chess.new_game(fen, use_bitboard)
+    except ValueError as error:
+        return {"fen": fen, "error": str(error)}
+
+    moves = rules.legal_moves(board.turn)
+    status, result = rules.game_status(moves)
+    return {
+        "fen": fen,
+        "turn": board.turn,
+        "in_check": rules.is_in_check(board.turn),
+        "checkmate": status == "checkmate",
+        "stalemate": status == "stalemate",
+        "status": status,
+        "result": result,
+        "legal_moves": [repr(move) for move in moves],
+    }
+
+
+def _analyze_job(job):
+    fen, use_bitboard = job
+    return json.dumps(analyze_position(fen, use_bitboard))
+
+
+def analyze_file(path, workers=1, output=None, batch_size=256, use_bitboard=False):
+    """Write a JSONL line per FEN line of path, in input order.
+    Returns the number of positions analyzed."""
+    output = output if output is not None else sys.stdout
+    start = time.perf_counter()
+    count = 0
+    jobs = ((fen, use_bitboard) for fen in chess.read_fens(path))
+    for line in imap_bounded(_analyze_job, jobs, workers, batch_size):
+        output.write(line + "\n")
+        count += 1
+
+    # The summary goes to stderr so stdout stays valid JSONL
+    elapsed = time.perf_counter() - start
+    print(f"{count} positions in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f} positions/s)",
+          file=sys.stderr)
+    return count
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# Bitboard backend for chess.py
+# Square index is y * 8 + x, so bit 0 is a8 and bit 63 is h1 (same (y, x) as Board.board)
+
+import chess
+
+FULL = (1 << 64) - 1
+
+
+def square_index(pos):
+    return pos[0] * 8 + pos[1]
+
+
+def index_square(index):
+    return divmod(index, 8)
+
+
+def _step_table(offsets):
+    table = []
+    for index in range(64):
+        y, x = index_square(index)
+        mask = 0
+        for dy, dx in offsets:
+            if 0 <= y + dy < 8 and 0 <= x + dx < 8:
+                mask |= 1 << square_index((y + dy, x + dx))
+        table.append(mask)
+    return table
+
+
+def _ray_table(dy, dx):
+    table = []
+    for index in range(64):
+        y, x = index_square(index)
+        mask = 0
+        y, x = y + dy, x + dx
+        while 0 <= y < 8 and 0 <= x < 8:
+            mask |= 1 << square_index((y, x))
+            y, x = y + dy, x + dx
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _step_table(chess.KNIGHT_OFFSETS)
+KING_ATTACKS = _step_table(chess.KING_OFFSETS)
+# Squares a pawn of the given color attacks from each square
+PAWN_ATTACKS = {"white": _step_table([(-1, -1), (-1, 1)]),
+                "black": _step_table([(1, -1), (1, 1)])}
+
+# Rays going towards higher indexes stop at their lowest blocker, the others at the highest
+POSITIVE_RAYS = {d: _ray_table(*d) for d in [(1, 0), (0, 1), (1, 1), (1, -1)]}
+NEGATIVE_RAYS = {d: _ray_table(*d) for d in [(-1, 0), (0, -1), (-1, -1), (-1, 1)]}
+
+
+def ray_attacks(direction, index, occupied):
+    if direction in POSITIVE_RAYS:
+        ray = POSITIVE_RAYS[direction][index]
+        blockers = ray & occupied
+        if blockers:
+            first = (blockers & -blockers).bit_length() - 1
+            ray ^= POSITIVE_RAYS[direction][first]
+    else:
+        ray = NEGATIVE_RAYS[direction][index]
+        blockers = ray & occupied
+        if blockers:
+            first = blockers.bit_length() - 1
+            ray ^= NEGATIVE_RAYS[direction][first]
+    return ray
+
+
+def _slider_tables(directions):
+    # Per square: the blocker mask (the rays without their edge squares, which never
+    # block anything) and a table from every blocker subset to the attacked squares
+    masks = []
+    tables = []
+    for index in range(64):
+        mask = 0
+        for dy, dx in directions:
+            y, x = index_square(index)
+            y, x = y + dy, x + dx
+            while 0 <= y + dy < 8 and 0 <= x + dx < 8:
+                mask |= 1 << square_index((y, x))
+                y, x = y + dy, x + dx
+        table = {}
+        subset = 0
+        while True:  # every subset of mask, smallest first
+            attacks = 0
+            for direction in directions:
+                attacks |= ray_attacks(direction, index, subset)
+            table[subset] = attacks
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+ROOK_MASKS, ROOK_TABLES = _slider_tables(chess.ROOK_DIRECTIONS)
+BISHOP_MASKS, BISHOP_TABLES = _slider_tables(chess.BISHOP_DIRECTIONS)
+
+
+SQUARES = [index_square(index) for index in range(64)]
+
+
+def _between_table():
+    # Squares strictly between two squares on a shared line, 0 when they share none
+    table = [[0] * 64 for _ in range(64)]
+    for index in range(64):
+        for dy, dx in chess.QUEEN_DIRECTIONS:
+            mask = 0
+            y, x = index_square(index)
+            y, x = y + dy, x + dx
+            while 0 <= y < 8 and 0 <= x < 8:
+                table[index][square_index((y, x))] = mask
+                mask |= 1 << square_index((y, x))
+                y, x = y + dy, x + dx
+    return table
+
+
+BETWEEN = _between_table()
+
+
+def bits(mask):
+    """Indexes of the set bits of mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitBoard(chess.Board):
+    """Board that mirrors Board.board into twelve piece bitboards"""
+
+    def __init__(self):
+        self.bitboards = {color + kind: 0 for color in "wb" for kind in "KQRBNP"}
+        self.occupancy = {"white": 0, "black": 0}
+        super().__init__()
+
+    def put_piece(self, y, x, piece):
+        super().put_piece(y, x, piece)
+        bit = 1 << (y * 8 + x)
+        self.bitboards[piece.symbol()] |= bit
+        self.occupancy[piece.color] |= bit
+
+    def remove_piece(self, y, x):
+        piece = super().remove_piece(y, x)
+        if piece is not None:
+            mask = FULL ^ (1 << (y * 8 + x))
+            self.bitboards[piece.symbol()] &= mask
+            self.occupancy[piece.color] &= mask
+        return piece
+
+
+class BitCheckMate(chess.CheckMate):
+    """CheckMate whose attack, check and legal move queries use BitBoard masks"""
+
+    def analyze_masks(self, color):
+        """Checks and pins of color as masks: (checkers, evasions, pins) where evasions
+        are the squares a non-king move must land on (every square when not in check)
+        and pins maps each pinned piece's bit to the line it may still move along"""
+        bitboards = self.position.bitboards
+        king = self.find_king(color)
+        if king is None:
+            return 0, FULL, {}
+        index = square_index(king)
+        side = "b" if color == "white" else "w"
+        occupancy = self.position.occupancy
+        own = occupancy[color]
+        occupied = occupancy["white"] | occupancy["black"]
+        checkers = (KNIGHT_ATTACKS[index] & bitboards[side + "N"]) | (PAWN_ATTACKS[color][index] & bitboards[side + "P"])
+        pins = {}
+        queens = bitboards[side + "Q"]
+        # Sliders that would see the king on an empty board, then what stands between
+        snipers = ((ROOK_TABLES[index][0] & (bitboards[side + "R"] | queens)) |
+                   (BISHOP_TABLES[index][0] & (bitboards[side + "B"] | queens)))
+        for sniper in bits(snipers):
+            between = BETWEEN[index][sniper]
+            blockers = between & occupied
+            if not blockers:
+                checkers |= 1 << sniper
+            elif blockers & (blockers - 1) == 0 and blockers & own:
+                pins[blockers] = between | 1 << sniper
+        if not checkers:
+            return checkers, FULL, pins
+        if checkers & (checkers - 1):
+            return checkers, 0, pins  # Double check, only the king can move
+        return checkers, checkers | BETWEEN[index][checkers.bit_length() - 1], pins
+
+    def generate_legal_moves(self, color):
+        position = self.position
+        bitboards = position.bitboards
+        prefix = "w" if color == "white" else "b"
+        opponent_color = "black" if color == "white" else "white"
+        own = position.occupancy[color]
+        enemy = position.occupancy[opponent_color]
+        occupied = own | enemy
+        checkers, evasions, pins = self.analyze_masks(color)
+        Move = chess.Move
+
+        if evasions:
+            targets = evasions & ~own
+            for kind, table, masks in (("N", None, None), ("B", BISHOP_TABLES, BISHOP_MASKS),
+                                       ("R", ROOK_TABLES, ROOK_MASKS), ("Q", None, None)):
+                for index in bits(bitboards[prefix + kind]):
+                    if kind == "N":
+                        attacks = KNIGHT_ATTACKS[index]
+                    elif kind == "Q":
+                        attacks = (ROOK_TABLES[index][occupied & ROOK_MASKS[index]] |
+                                   BISHOP_TABLES[index][occupied & BISHOP_MASKS[index]])
+                    else:
+                        attacks = table[index][occupied & masks[index]]
+                    attacks &= targets
+                    pin = pins.get(1 << index)
+                    if pin is not None:
+                        attacks &= pin
+                    from_pos = SQUARES[index]
+                    while attacks:
+                        low = attacks & -attacks
+                        yield Move(from_pos, SQUARES[low.bit_length() - 1])
+                        attacks ^= low
+
+            # Pawns, white moving towards index 0
+            step = -8 if color == "white" else 8
+            start_row = 6 if color == "white" else 1
+            for index in bits(bitboards[prefix + "P"]):
+                reach = PAWN_ATTACKS[color][index] & enemy
+                push = index + step
+                if not occupied >> push & 1:
+                    reach |= 1 << push
+                    if index >> 3 == start_row and not occupied >> (push + step) & 1:
+                        reach |= 1 << (push + step)
+                reach &= evasions
+                pin = pins.get(1 << index)
+                if pin is not None:
+                    reach &= pin
+                from_pos = SQUARES[index]
+                while reach:
+                    low = reach & -reach
+                    reach ^= low
+                    to_pos = SQUARES[low.bit_length() - 1]
+                    if to_pos[0] in (0, 7):
+                        for promotion in "qrbn":
+                            yield Move(from_pos, to_pos, promotion)
+                    else:
+                        yield Move(from_pos, to_pos)
+            # En passant can uncover a check along the rank, the base class plays it out
+            for from_pos, to_pos in self.en_passant_moves(color):
+                if self.leaves_king_safe(self.board[from_pos[0]][from_pos[1]], from_pos, to_pos):
+                    yield Move(from_pos, to_pos)
+
+        king_pos = position.king_squares[color]
+        if king_pos is None:
+            return
+        index = square_index(king_pos)
+        for target in bits(KING_ATTACKS[index] & ~own):
+            if not self.is_square_attacked(SQUARES[target], opponent_color, ignore=king_pos):
+                yield Move(king_pos, SQUARES[target])
+        king = self.board[king_pos[0]][king_pos[1]]
+        if not checkers and not king.has_moved and king_pos == ((7 if color == "white" else 0), 4):
+            if king.can_castle_kingside(self.board, self):
+                yield Move(king_pos, (king_pos[0], 6))
+            if king.can_castle_queenside(self.board, self):
+                yield Move(king_pos, (king_pos[0], 2))
+
+    def is_square_attacked(self, square, by_color, ignore=None):
+        bitboards = self.position.bitboards
+        index = square_index(square)
+        side = "w" if by_color == "white" else "b"
+        defender = "black" if by_color == "white" else "white"
+
+        if KNIGHT_ATTACKS[index] & bitboards[side + "N"]:
+            return True
+        if KING_ATTACKS[index] & bitboards[side + "K"]:
+            return True
+        # A pawn attacks this square if a defending pawn here would attack it back
+        if PAWN_ATTACKS[defender][index] & bitboards[side + "P"]:
+            return True
+
+        occupancy = self.position.occupancy
+        occupied = occupancy["white"] | occupancy["black"]
+        if ignore is not None:
+            occupied &= FULL ^ (1 << square_index(ignore))
+        queens = bitboards[side + "Q"]
+        # One table lookup per slider kind, keyed by the blockers on its lines
+        if ROOK_TABLES[index][occupied & ROOK_MASKS[index]] & (bitboards[side + "R"] | queens):
+            return True
+        if BISHOP_TABLES[index][occupied & BISHOP_MASKS[index]] & (bitboards[side + "B"] | queens):
+            return True
+        return False
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# Opening book: sorted binary (position hash, move, weight) records, read through mmap.
+# File layout: 8-byte magic, record count (uint64), then 12-byte little-endian records
+#   hash (uint64, Board.hash) | move (uint16, Move.encode()) | weight (uint16)
+# sorted by hash, so all moves of a position are adjacent and found by binary search.
+
+import mmap
+import os
+import random
+import struct
+import time
+
+import chess
+import pgn
+from workers import imap_bounded
+
+MAGIC = b"CHESSBK1"
+HEADER = struct.Struct("<8sQ")
+RECORD = struct.Struct("<QHH")
+MAX_WEIGHT = 0xFFFF
+
+
+class OpeningBook:
+    def __init__(self, path):
+        self.handle = open(path, "rb")
+        self.data = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or HEADER.size + self.count * RECORD.size != len(self.data):
+            self.close()
+            raise ValueError(f"Not an opening book: {path}")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.handle.close()
+            self.data = None
+
+    def _key_at(self, index):
+        return struct.unpack_from("<Q", self.data, HEADER.size + index * RECORD.size)[0]
+
+    def _first_index(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, key):
+        """(Move, weight) pairs stored for a position hash"""
+        index = self._first_index(key)
+        found = []
+        while index < self.count:
+            entry_key, code, weight = RECORD.unpack_from(self.data, HEADER.size + index * RECORD.size)
+            if entry_key != key:
+                break
+            found.append((chess.Move.decode(code), weight))
+            index += 1
+        return found
+
+    def choose(self, rules, rng=random):
+        """A book move for the current position picked by weight, or None when out of book.
+        Moves that are not legal here (hash collisions) are skipped."""
+        board = rules.position
+        legal = rules.legal_moves(board.turn)
+        entries = [(move, weight) for move, weight in self.entries(board.hash) if weight and move in legal]
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return rng.choices(moves, weights)[0]
+
+
+def _game_entries(job):
+    # (hash, move code, points) for the first plies of one game; points favour the winner
+    game, plies = job
+    try:
+        board, rules = chess.new_game(game.headers.get("FEN"))
+    except ValueError:
+        return []
+    found = []
+    for san in game.moves[:plies]:
+        try:
+            move = pgn.parse_san(rules, san)
+        except ValueError:
+            break
+        if game.result == "1/2-1/2":
+            points = 1
+        elif game.result in ("1-0", "0-1"):
+            points = 2 if (game.result == "1-0") == (board.turn == "white") else 0
+        else:
+            points = 1
+        found.append((board.hash, move.encode(), points))
+        board.make_move(move)
+    return found
+
+
+def build(pgn_path, book_path, plies=20, workers=1, min_games=1):
+    """Compile the first plies of every game in a PGN file into a book.
+    Moves seen in fewer than min_games games are left out. Returns the record count."""
+    start = time.perf_counter()
+    counts = {}
+    games = 0
+    jobs = ((game, plies) for game in pgn.read_games(pgn_path))
+    for found in imap_bounded(_game_entries, jobs, workers):
+        games += 1
+        for key, code, points in found:
+            seen, total = counts.get((key, code), (0, 0))
+            counts[(key, code)] = (seen + 1, total + points)
+
+    records = sorted((key, code, total) for (key, code), (seen, total) in counts.items() if seen >= min_games)
+    # Scale weights into 16 bits, keeping every kept move above zero
+    scale = max((total for _, _, total in records), default=0) / MAX_WEIGHT
+    temporary = book_path + ".tmp"
+    with open(temporary, "wb") as output:
+        output.write(HEADER.pack(MAGIC, len(records)))
+        for key, code, total in records:
+            weight = max(1, int(total / scale)) if scale > 1 else max(1, total)
+            output.write(RECORD.pack(key, code, weight))
+    os.replace(temporary, book_path)
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(records)} book moves from {games} games in {elapsed:.2f}s")
+    return len(records)
@@ -1,21 +1,151 @@
 #!/usr/bin/env python3
+import argparse
+import random
+import struct
+import sys
+
+from piece_square import ENDGAME_SCORES, MAX_PHASE, MIDDLEGAME_SCORES, PHASE_WEIGHTS
 
 class Piece:
+    __slots__ = ("color",)  # No per-instance __dict__, a board holds up to 32 of these
+
     def __init__(self, color):
         self.color = color
     # from_pos = (y, x) is tuple then to_pos = (y, x)
     # x is like OX (a, b, c, d, e, f, g, h) 
     # y is like OY (8, 7, 6, 5, 4, 3, 2, 1) 
-    def capture_move(self, board, from_pos, to_pos):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
-        target = board[y2][x2]
-        if target is None or target.color != self.color:
-            board[y2][x2] = board[y1][x1]
-            board[y1][x1] = None
-            return True
-        else:
-            return False  
+    def slide_moves(self, board, pos, directions):
+        # Walk each direction until the edge, a friendly piece or a capture
+        y1, x1 = pos
+        for dy, dx in directions:
+            y, x = y1 + dy, x1 + dx
+            while 0 <= y < 8 and 0 <= x < 8:
+                target = board[y][x]
+                if target is None:
+                    yield (y, x)
+                else:
+                    if target.color != self.color:
+                        yield (y, x)
+                    break
+                y += dy
+                x += dx
+
+    def step_moves(self, board, pos, offsets):
+        # Single jumps (knight and king) onto empty or enemy squares
+        y1, x1 = pos
+        for dy, dx in offsets:
+            y, x = y1 + dy, x1 + dx
+            if 0 <= y < 8 and 0 <= x < 8:
+                target = board[y][x]
+                if target is None or target.color != self.color:
+                    yield (y, x)
+
+
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+KING_OFFSETS = QUEEN_DIRECTIONS
+
+# Zobrist keys, seeded so every process hashes positions the same way
+_zobrist_random = random.Random(20240601)
+PIECE_KEYS = {color + kind: [_zobrist_random.getrandbits(64) for _ in range(64)]
+              for color in "wb" for kind in "KQRBNP"}
+SIDE_KEY = _zobrist_random.getrandbits(64)  # xored in when black is to move
+CASTLING_KEYS = [_zobrist_random.getrandbits(64) for _ in range(16)]
+EN_PASSANT_KEYS = [_zobrist_random.getrandbits(64) for _ in range(8)]
+
+# Castling right bits (K, Q, k, q) with the king and rook squares they depend on
+CASTLING_SQUARES = [(1, "white", (7, 4), (7, 7)), (2, "white", (7, 4), (7, 0)),
+                    (4, "black", (0, 4), (0, 7)), (8, "black", (0, 4), (0, 0))]
+CASTLING_HOME_SQUARES = {(7, 4), (7, 7), (7, 0), (0, 4), (0, 7), (0, 0)}
+
+
+PROMOTION_CODES = [None, "n", "b", "r", "q"]
+
+
+class Move:
+    def __init__(self, from_pos, to_pos, promotion=None):
+        self.from_pos = from_pos
+        self.to_pos = to_pos
+        self.promotion = promotion  # "q", "r", "b", "n" or None
+
+    def __eq__(self, other):
+        return (isinstance(other, Move) and self.from_pos == other.from_pos and
+                self.to_pos == other.to_pos and self.promotion == other.promotion)
+
+    def __hash__(self):
+        return hash((self.from_pos, self.to_pos, self.promotion))
+
+    def __repr__(self):
+        return matrix_to_user(self.from_pos) + matrix_to_user(self.to_pos) + (self.promotion or "")
+
+    def encode(self):
+        """Pack into 16 bits: from square, to square (6 bits each), promotion (3 bits)"""
+        y1, x1 = self.from_pos
+        y2, x2 = self.to_pos
+        return (y1 * 8 + x1) | (y2 * 8 + x2) << 6 | PROMOTION_CODES.index(self.promotion) << 12
+
+    @staticmethod
+    def decode(code):
+        return Move(divmod(code & 63, 8), divmod(code >> 6 & 63, 8), PROMOTION_CODES[code >> 12 & 7])
+
+
+# Square codes of a Position: 1..6 for white P N B R Q K, plus 8 for black, 0 for empty
+SQUARE_LETTERS = " PNBRQK"
+BLACK_CODE = 8
+
+
+class Position:
+    """Compact snapshot of a Board: 64 bytes of square codes (index y * 8 + x) plus
+    the side to move, castling bits, en passant square and the move clocks.
+    Cheap to copy, hash, compare and serialize (to_bytes is 70 bytes)."""
+
+    __slots__ = ("squares", "turn", "castling", "en_passant", "halfmove_clock", "fullmove_number")
+    STATE = struct.Struct("<BbHH")  # turn | castling << 1, en passant index (-1), clocks
+
+    def __init__(self, squares=None, turn="white", castling=0, en_passant=None,
+                 halfmove_clock=0, fullmove_number=1):
+        self.squares = squares if squares is not None else bytearray(64)
+        self.turn = turn
+        self.castling = castling
+        self.en_passant = en_passant
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+
+    def piece_at(self, y, x):
+        """Symbol ("wK", "bP", ...) on a square, or None"""
+        code = self.squares[y * 8 + x]
+        if not code:
+            return None
+        return ("b" if code & BLACK_CODE else "w") + SQUARE_LETTERS[code & 7]
+
+    def copy(self):
+        return Position(bytearray(self.squares), self.turn, self.castling, self.en_passant,
+                        self.halfmove_clock, self.fullmove_number)
+
+    def to_bytes(self):
+        ep = self.en_passant[0] * 8 + self.en_passant[1] if self.en_passant is not None else -1
+        state = (self.turn == "black") | self.castling << 1
+        return bytes(self.squares) + self.STATE.pack(state, ep, self.halfmove_clock, self.fullmove_number)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) != 64 + cls.STATE.size:
+            raise ValueError(f"Invalid position record of {len(data)} bytes")
+        state, ep, halfmove_clock, fullmove_number = cls.STATE.unpack_from(data, 64)
+        return cls(bytearray(data[:64]), "black" if state & 1 else "white", state >> 1,
+                   divmod(ep, 8) if ep >= 0 else None, halfmove_clock, fullmove_number)
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.to_bytes() == other.to_bytes()
+
+    def __hash__(self):
+        return hash(self.to_bytes())
+
+    def __repr__(self):
+        return f"Position({self.to_bytes().hex()})"
+
 
 class Board:
     def __init__(self):
@@ -25,21 +155,362 @@ class Board:
             for cell in range(8):
                 row.append(None)
             self.board.append(row)
+        self.turn = "white"
+        self.en_passant = None  # square a pawn can capture onto en passant
+        self.undo_stack = []
+        # Kept up to date by put_piece/remove_piece
+        self.piece_squares = {"white": set(), "black": set()}
+        self.king_squares = {"white": None, "black": None}
+        # Zobrist hash of the position, kept up to date by every board change
+        self.hash = 0
+        self.castling = 0
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.position_counts = {}
+        # Material + piece-square sums (white minus black), game phase and the pawn-only
+        # Zobrist key, all kept up to date by put_piece/remove_piece for evaluation.py
+        self.middlegame_score = 0
+        self.endgame_score = 0
+        self.phase = 0
+        self.pawn_hash = 0
         
     
     def is_empty(self, y, x):
         return self.board[y][x] is None
+
+    def put_piece(self, y, x, piece):
+        self.board[y][x] = piece
+        symbol = piece.symbol()
+        square = y * 8 + x
+        self.hash ^= PIECE_KEYS[symbol][square]
+        self.middlegame_score += MIDDLEGAME_SCORES[symbol][square]
+        self.endgame_score += ENDGAME_SCORES[symbol][square]
+        self.phase += PHASE_WEIGHTS[symbol[1]]
+        if symbol[1] == "P":
+            self.pawn_hash ^= PIECE_KEYS[symbol][square]
+        self.piece_squares[piece.color].add((y, x))
+        if isinstance(piece, King):
+            self.king_squares[piece.color] = (y, x)
+
+    def remove_piece(self, y, x):
+        piece = self.board[y][x]
+        self.board[y][x] = None
+        if piece is not None:
+            symbol = piece.symbol()
+            square = y * 8 + x
+            self.hash ^= PIECE_KEYS[symbol][square]
+            self.middlegame_score -= MIDDLEGAME_SCORES[symbol][square]
+            self.endgame_score -= ENDGAME_SCORES[symbol][square]
+            self.phase -= PHASE_WEIGHTS[symbol[1]]
+            if symbol[1] == "P":
+                self.pawn_hash ^= PIECE_KEYS[symbol][square]
+            self.piece_squares[piece.color].discard((y, x))
+            if isinstance(piece, King) and self.king_squares[piece.color] == (y, x):
+                self.king_squares[piece.color] = None
+        return piece
     
     def setup(self):
         figures = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
 
         for x, figure in enumerate(figures):
-            self.board[0][x] = figure("black")
-            self.board[1][x] = Pawn("black")
+            self.put_piece(0, x, figure("black"))
+            self.put_piece(1, x, Pawn("black"))
 
         for x, figure in enumerate(figures):
-            self.board[6][x] = Pawn("white")
-            self.board[7][x] = figure("white")
+            self.put_piece(6, x, Pawn("white"))
+            self.put_piece(7, x, figure("white"))
+        self.reset_history()
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Build a board from a FEN string"""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        rows = fields[0].split("/")
+        if len(rows) != 8:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+        board = cls()
+        kings = {"white": 0, "black": 0}
+        for y, row in enumerate(rows):
+            x = 0
+            for char in row:
+                if char.isdigit():
+                    x += int(char)
+                    continue
+                figure = FEN_PIECES.get(char.lower())
+                if figure is None or x > 7:
+                    raise ValueError(f"Invalid FEN: {fen!r}")
+                color = "white" if char.isupper() else "black"
+                if figure is King:
+                    kings[color] += 1
+                board.put_piece(y, x, figure(color))
+                x += 1
+            if x != 8:
+                raise ValueError(f"Invalid FEN: {fen!r}")
+        # Exactly one king each, legal moves and check detection rely on it
+        if kings != {"white": 1, "black": 1}:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+
+        if fields[1] not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        board.turn = "white" if fields[1] == "w" else "black"
+        if fields[2] != "-" and (not set(fields[2]) <= set("KQkq") or len(set(fields[2])) != len(fields[2])):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        board.set_castling_rights(sum(bit for bit, letter in zip((1, 2, 4, 8), "KQkq") if letter in fields[2]))
+        if fields[3] != "-":
+            square = user_to_matrix(fields[3])
+            # The square behind a pawn that just made a double step: rank 6 with white
+            # to move (the black pawn stands below it), rank 3 with black to move
+            if square is None or square[0] != (2 if board.turn == "white" else 5):
+                raise ValueError(f"Invalid FEN: {fen!r}")
+            y, x = square
+            pawn = board.board[y + 1 if board.turn == "white" else y - 1][x]
+            if board.board[y][x] is not None or not isinstance(pawn, Pawn) or pawn.color == board.turn:
+                raise ValueError(f"Invalid FEN: {fen!r}")
+            board.en_passant = square
+        try:
+            if len(fields) > 4:
+                board.halfmove_clock = int(fields[4])
+            if len(fields) > 5:
+                board.fullmove_number = int(fields[5])
+        except ValueError:
+            raise ValueError(f"Invalid FEN: {fen!r}") from None
+        if board.halfmove_clock < 0 or board.fullmove_number < 1:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        # The side that just moved cannot have left its own king in check
+        if CheckMate(board).is_in_check("black" if board.turn == "white" else "white"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        board.reset_history()
+        return board
+
+    def set_castling_rights(self, rights):
+        # Kings and rooks keep has_moved = False only where a castling right says so
+        for piece in self.iter_pieces():
+            if hasattr(piece, "has_moved"):
+                piece.has_moved = True
+        for bit, color, king_pos, rook_pos in CASTLING_SQUARES:
+            if rights & bit:
+                king = self.board[king_pos[0]][king_pos[1]]
+                rook = self.board[rook_pos[0]][rook_pos[1]]
+                if isinstance(king, King) and isinstance(rook, Rook):
+                    king.has_moved = False
+                    rook.has_moved = False
+
+    def iter_pieces(self):
+        for color in ("white", "black"):
+            for y, x in self.piece_squares[color]:
+                yield self.board[y][x]
+
+    def snapshot(self):
+        """Compact Position copy of the current position"""
+        squares = bytearray(64)
+        for color in ("white", "black"):
+            offset = BLACK_CODE if color == "black" else 0
+            for y, x in self.piece_squares[color]:
+                squares[y * 8 + x] = SQUARE_LETTERS.index(self.board[y][x].symbol()[1]) | offset
+        return Position(squares, self.turn, self.castling_rights(), self.en_passant,
+                        self.halfmove_clock, self.fullmove_number)
+
+    @classmethod
+    def from_snapshot(cls, position):
+        """Build a playable board (piece objects, hash, history) from a Position"""
+        board = cls()
+        for index, code in enumerate(position.squares):
+            if code:
+                color = "black" if code & BLACK_CODE else "white"
+                board.put_piece(index // 8, index % 8, FEN_PIECES[SQUARE_LETTERS[code & 7].lower()](color))
+        board.turn = position.turn
+        board.set_castling_rights(position.castling)
+        board.en_passant = position.en_passant
+        board.halfmove_clock = position.halfmove_clock
+        board.fullmove_number = position.fullmove_number
+        board.reset_history()
+        return board
+
+    def to_fen(self):
+        """Describe the position as a FEN string"""
+        rows = []
+        for y in range(8):
+            row = ""
+            empty = 0
+            for x in range(8):
+                piece = self.board[y][x]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = piece.symbol()[1]
+                row += letter if piece.color == "white" else letter.lower()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+
+        rights = self.castling_rights()
+        castling = "".join(letter for bit, letter in zip((1, 2, 4, 8), "KQkq") if rights & bit) or "-"
+        en_passant = matrix_to_user(self.en_passant) if self.en_passant is not None else "-"
+        return (f"{'/'.join(rows)} {'w' if self.turn == 'white' else 'b'} {castling} {en_passant} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
+    def castling_rights(self):
+        """Castling rights as K=1, Q=2, k=4, q=8 bits, from the has_moved flags"""
+        rights = 0
+        for bit, color, king_pos, rook_pos in CASTLING_SQUARES:
+            king = self.board[king_pos[0]][king_pos[1]]
+            rook = self.board[rook_pos[0]][rook_pos[1]]
+            if (isinstance(king, King) and king.color == color and not king.has_moved and
+                    isinstance(rook, Rook) and rook.color == color and not rook.has_moved):
+                rights |= bit
+        return rights
+
+    def en_passant_file(self):
+        # Only counts when the side to move has a pawn that could take en passant
+        if self.en_passant is None:
+            return None
+        y, x = self.en_passant
+        row = y + 1 if self.turn == "white" else y - 1
+        for col in (x - 1, x + 1):
+            if 0 <= col < 8:
+                piece = self.board[row][col]
+                if isinstance(piece, Pawn) and piece.color == self.turn:
+                    return x
+        return None
+
+    def compute_hash(self):
+        """Hash the position from scratch (make_move updates it incrementally)"""
+        key = 0
+        for y in range(8):
+            for x in range(8):
+                piece = self.board[y][x]
+                if piece is not None:
+                    key ^= PIECE_KEYS[piece.symbol()][y * 8 + x]
+        if self.turn == "black":
+            key ^= SIDE_KEY
+        key ^= CASTLING_KEYS[self.castling_rights()]
+        ep_file = self.en_passant_file()
+        if ep_file is not None:
+            key ^= EN_PASSANT_KEYS[ep_file]
+        return key
+
+    def reset_history(self):
+        # Start hash tracking over from the current position
+        self.castling = self.castling_rights()
+        self.hash = self.compute_hash()
+        self.position_counts = {self.hash: 1}
+
+    def repetition_count(self):
+        return self.position_counts.get(self.hash, 0)
+
+    def is_threefold_repetition(self):
+        return self.repetition_count() >= 3
+
+    def is_fifty_moves(self):
+        return self.halfmove_clock >= 100
+
+    def make_move(self, move):
+        """Play a move (assumed legal) and push an undo record"""
+        y1, x1 = move.from_pos
+        y2, x2 = move.to_pos
+        piece = self.board[y1][x1]
+        key = self.hash
+        ep_file = self.en_passant_file()
+
+        # Captured piece, which sits beside the pawn for en passant
+        captured_pos = move.to_pos
+        if isinstance(piece, Pawn) and x1 != x2 and self.board[y2][x2] is None:
+            captured_pos = (y1, x2)
+        captured = self.board[captured_pos[0]][captured_pos[1]]
+        if captured is not None:
+            self.remove_piece(*captured_pos)
+
+        # Castling also moves the rook
+        rook_move = None
+        rook_moved = None
+        if isinstance(piece, King) and abs(x2 - x1) == 2:
+            rook_from = (y1, 7 if x2 > x1 else 0)
+            rook_to = (y1, 5 if x2 > x1 else 3)
+            rook = self.remove_piece(*rook_from)
+            rook_moved = rook.has_moved
+            rook.has_moved = True
+            self.put_piece(*rook_to, rook)
+            rook_move = (rook_from, rook_to)
+
+        # The original piece is kept so a promotion is undone by putting the pawn back
+        record = (move, piece, getattr(piece, "has_moved", None), captured, captured_pos,
+                  rook_move, rook_moved, self.en_passant, key, self.castling, self.halfmove_clock)
+        self.undo_stack.append(record)
+
+        self.remove_piece(y1, x1)
+        if isinstance(piece, Pawn) and y2 in (0, 7):
+            self.put_piece(y2, x2, PROMOTION_PIECES[move.promotion or "q"](piece.color))
+        else:
+            if hasattr(piece, "has_moved"):
+                piece.has_moved = True
+            self.put_piece(y2, x2, piece)
+
+        if isinstance(piece, Pawn) and abs(y2 - y1) == 2:
+            self.en_passant = ((y1 + y2) // 2, x1)
+        else:
+            self.en_passant = None
+        self.turn = "black" if self.turn == "white" else "white"
+
+        if isinstance(piece, Pawn) or captured is not None:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.turn == "white":
+            self.fullmove_number += 1
+
+        # Pieces were hashed by put/remove, now side to move, castling and en passant
+        self.hash ^= SIDE_KEY
+        # Rights can only be lost when a king or rook leaves or is taken on its home square
+        if self.castling and (move.from_pos in CASTLING_HOME_SQUARES or move.to_pos in CASTLING_HOME_SQUARES):
+            castling = self.castling_rights()
+            if castling != self.castling:
+                self.hash ^= CASTLING_KEYS[self.castling] ^ CASTLING_KEYS[castling]
+                self.castling = castling
+        if ep_file is not None:
+            self.hash ^= EN_PASSANT_KEYS[ep_file]
+        ep_file = self.en_passant_file()
+        if ep_file is not None:
+            self.hash ^= EN_PASSANT_KEYS[ep_file]
+        self.position_counts[self.hash] = self.position_counts.get(self.hash, 0) + 1
+
+    def unmake_move(self):
+        """Take back the last move played with make_move"""
+        (move, piece, has_moved, captured, captured_pos, rook_move, rook_moved,
+         en_passant, key, castling, halfmove_clock) = self.undo_stack.pop()
+        count = self.position_counts[self.hash] - 1
+        if count:
+            self.position_counts[self.hash] = count
+        else:
+            del self.position_counts[self.hash]
+        self.turn = "black" if self.turn == "white" else "white"
+        self.en_passant = en_passant
+        self.castling = castling
+        self.halfmove_clock = halfmove_clock
+        if self.turn == "black":
+            self.fullmove_number -= 1
+
+        self.remove_piece(*move.to_pos)
+        if has_moved is not None:
+            piece.has_moved = has_moved
+        self.put_piece(*move.from_pos, piece)
+
+        if rook_move is not None:
+            rook = self.remove_piece(*rook_move[1])
+            rook.has_moved = rook_moved
+            self.put_piece(*rook_move[0], rook)
+
+        if captured is not None:
+            self.put_piece(*captured_pos, captured)
+
+        # The pieces went back through put/remove, the rest of the key is restored directly
+        self.hash = key
+        return move
         
     def show_board(self):
         for i in range(8):
@@ -55,108 +526,219 @@ class Board:
 
 class CheckMate:
     def __init__(self, board):
+        self.position = board
         self.board = board.board
+        self.tablebase = None  # tablebase.Tablebase to settle KQK, KRK and KPK endings
+
+    def probe_tablebase(self):
+        """("win" | "loss" | "draw", plies to mate) for the side to move when the
+        tablebase covers the position, otherwise None"""
+        if self.tablebase is None:
+            return None
+        return self.tablebase.probe(self.position)
     
     def find_king(self, color):
-        for y in range(8):
-            for x in range(8):
-                piece = self.board[y][x]
-                if isinstance(piece, King) and piece.color == color:
-                    return (y, x)
-        return None
+        return self.position.king_squares[color]
     
     def is_in_check(self, color):
         king_pos = self.find_king(color)
         if king_pos is None:
             return False
         opponent_color = "black" if color == "white" else "white"
-        
-        # Checking if any opponent piece can attack the king
-        for y in range(8):
-            for x in range(8):
-                piece = self.board[y][x]
-                if piece is not None and piece.color == opponent_color:
-                    if self.can_piece_attack(piece, (y, x), king_pos):
+        return self.is_square_attacked(king_pos, opponent_color)
+
+    def is_square_attacked(self, square, by_color, ignore=None):
+        """Look outward from square for a piece of by_color attacking it.
+        The ignore square is treated as empty (e.g. the king that is moving away)."""
+        board = self.board
+        y, x = square
+
+        for dy, dx in KNIGHT_OFFSETS:
+            ty, tx = y + dy, x + dx
+            if 0 <= ty < 8 and 0 <= tx < 8:
+                piece = board[ty][tx]
+                if isinstance(piece, Knight) and piece.color == by_color:
+                    return True
+
+        for dy, dx in KING_OFFSETS:
+            ty, tx = y + dy, x + dx
+            if 0 <= ty < 8 and 0 <= tx < 8:
+                piece = board[ty][tx]
+                if isinstance(piece, King) and piece.color == by_color:
+                    return True
+
+        # White pawns attack upwards, so they sit one row below the square
+        ty = y + 1 if by_color == "white" else y - 1
+        if 0 <= ty < 8:
+            for tx in (x - 1, x + 1):
+                if 0 <= tx < 8:
+                    piece = board[ty][tx]
+                    if isinstance(piece, Pawn) and piece.color == by_color:
                         return True
+
+        for directions, sliders in ((ROOK_DIRECTIONS, (Rook, Queen)), (BISHOP_DIRECTIONS, (Bishop, Queen))):
+            for dy, dx in directions:
+                ty, tx = y + dy, x + dx
+                while 0 <= ty < 8 and 0 <= tx < 8:
+                    piece = board[ty][tx]
+                    if piece is not None and (ty, tx) != ignore:
+                        if isinstance(piece, sliders) and piece.color == by_color:
+                            return True
+                        break
+                    ty += dy
+                    tx += dx
         return False
 
-    def can_piece_attack(self, piece, piece_pos, target_pos):
-        # Testing if piece at piece_pos can attack target_pos
-        # This is a copy of the board state to test the move
-        original_target = self.board[target_pos[0]][target_pos[1]]
-        original_piece = self.board[piece_pos[0]][piece_pos[1]]
-        
-        if isinstance(piece, King):
-            y1, x1 = piece_pos
-            y2, x2 = target_pos
-            # King can attack if it's within one square (but we don't check for check here)
-            if abs(y2 - y1) <= 1 and abs(x2 - x1) <= 1 and not (y1 == y2 and x1 == x2):
-                return True
-            return False
-        elif isinstance(piece, Pawn):
-            # Pawn diagonal attack 
-            y1, x1 = piece_pos
-            y2, x2 = target_pos
-            step = -1 if piece.color == "white" else 1
-            if abs(x2 - x1) == 1 and y2 == y1 + step:
-                return True
-            return False
-        else:
-            result = piece.move(self.board, piece_pos, target_pos)
-            # Restore the board state
-            self.board[piece_pos[0]][piece_pos[1]] = original_piece
-            self.board[target_pos[0]][target_pos[1]] = original_target
-            return result
+    def en_passant_moves(self, color):
+        # Pawns standing beside the pawn that just made a double step
+        target = self.position.en_passant
+        if target is None:
+            return
+        y2, x2 = target
+        y1 = y2 + 1 if color == "white" else y2 - 1
+        for x1 in (x2 - 1, x2 + 1):
+            if 0 <= x1 < 8:
+                piece = self.board[y1][x1]
+                if isinstance(piece, Pawn) and piece.color == color:
+                    yield (y1, x1), target
     
+    def analyze(self, color):
+        """Find what restricts the moves of color in one pass from its king.
+        Returns (checkers, pins, blocks): the squares of the checking pieces, a map
+        from each pinned piece to the squares it may still move to, and the squares
+        that capture or block the check (None when color is not in check)."""
+        checkers = []
+        pins = {}
+        blocks = None
+        king_pos = self.find_king(color)
+        if king_pos is None:
+            return checkers, pins, blocks
+        board = self.board
+        y, x = king_pos
+        opponent_color = "black" if color == "white" else "white"
+
+        for directions, sliders in ((ROOK_DIRECTIONS, (Rook, Queen)), (BISHOP_DIRECTIONS, (Bishop, Queen))):
+            for dy, dx in directions:
+                ray = []
+                pinned = None
+                ty, tx = y + dy, x + dx
+                while 0 <= ty < 8 and 0 <= tx < 8:
+                    ray.append((ty, tx))
+                    piece = board[ty][tx]
+                    if piece is not None:
+                        if piece.color == color:
+                            if pinned is not None:
+                                break
+                            pinned = (ty, tx)
+                        else:
+                            if isinstance(piece, sliders):
+                                if pinned is None:
+                                    checkers.append((ty, tx))
+                                    blocks = set(ray)
+                                else:
+                                    pins[pinned] = set(ray)
+                            break
+                    ty += dy
+                    tx += dx
+
+        for dy, dx in KNIGHT_OFFSETS:
+            ty, tx = y + dy, x + dx
+            if 0 <= ty < 8 and 0 <= tx < 8:
+                piece = board[ty][tx]
+                if isinstance(piece, Knight) and piece.color == opponent_color:
+                    checkers.append((ty, tx))
+                    blocks = {(ty, tx)}
+
+        ty = y - 1 if color == "white" else y + 1
+        if 0 <= ty < 8:
+            for tx in (x - 1, x + 1):
+                if 0 <= tx < 8:
+                    piece = board[ty][tx]
+                    if isinstance(piece, Pawn) and piece.color == opponent_color:
+                        checkers.append((ty, tx))
+                        blocks = {(ty, tx)}
+
+        if len(checkers) > 1:
+            blocks = set()  # Double check, only the king can move
+        return checkers, pins, blocks
+
+    def generate_legal_moves(self, color):
+        # Only the candidate squares each piece can reach are tested for legality,
+        # against checks and pins worked out once for the whole position
+        analysis = self.analyze(color)
+        for from_pos in list(self.position.piece_squares[color]):
+            piece = self.board[from_pos[0]][from_pos[1]]
+            for to_pos in piece.moves(self.board, from_pos):
+                if self.leaves_king_safe(piece, from_pos, to_pos, analysis):
+                    if isinstance(piece, Pawn) and to_pos[0] in (0, 7):
+                        # Every promotion piece is a separate move
+                        for promotion in "qrbn":
+                            yield Move(from_pos, to_pos, promotion)
+                    else:
+                        yield Move(from_pos, to_pos)
+        for from_pos, to_pos in self.en_passant_moves(color):
+            if self.leaves_king_safe(self.board[from_pos[0]][from_pos[1]], from_pos, to_pos, analysis):
+                yield Move(from_pos, to_pos)
+
+    def legal_moves(self, color):
+        """Return every legal move for color as a list of Move objects"""
+        return list(self.generate_legal_moves(color))
+
     def has_legal_moves(self, color):
-        for y1 in range(8): 
-            for x1 in range(8):  
-                piece = self.board[y1][x1]  
-                if piece and piece.color == color:  
-                    for y2 in range(8): 
-                        for x2 in range(8):  
-                            if self.is_legal_move(piece, (y1, x1), (y2, x2)):
-                                return True
+        for _ in self.generate_legal_moves(color):
+            return True
         return False
 
+    def game_status(self, moves=None):
+        """(status, result) for the side to move. status is "checkmate", "stalemate",
+        "repetition", "fifty_moves" or "playing", result is "1-0", "0-1", "1/2-1/2" or
+        None while playing. moves are the legal moves, if the caller has them already."""
+        board = self.position
+        if not (moves if moves is not None else self.has_legal_moves(board.turn)):
+            if self.is_in_check(board.turn):
+                return "checkmate", "0-1" if board.turn == "white" else "1-0"
+            return "stalemate", "1/2-1/2"
+        if board.is_threefold_repetition():
+            return "repetition", "1/2-1/2"
+        if board.is_fifty_moves():
+            return "fifty_moves", "1/2-1/2"
+        return "playing", None
+
     def is_legal_move(self, piece, from_pos, to_pos):
         # Test if a move is legal (doesn't leave king in check)
-        original_target = self.board[to_pos[0]][to_pos[1]]
-        original_piece = self.board[from_pos[0]][from_pos[1]]
-        
-        # Store original has_moved states for castling
-        king_moved_state = None
-        rook_moved_state = None
-        if isinstance(piece, King):
-            king_moved_state = piece.has_moved
-        if isinstance(piece, Rook):
-            rook_moved_state = piece.has_moved
-        
-        move_successful = False
+        if to_pos not in piece.moves(self.board, from_pos):
+            if (from_pos, to_pos) not in self.en_passant_moves(piece.color):
+                return False
+        return self.leaves_king_safe(piece, from_pos, to_pos)
+
+    def leaves_king_safe(self, piece, from_pos, to_pos, analysis=None):
         if isinstance(piece, King):
-            move_successful = piece.move(self.board, from_pos, to_pos, rules=self, check_only=True)
-        else:
-            move_successful = piece.move(self.board, from_pos, to_pos)
-            
-        if move_successful:
+            opponent_color = "black" if piece.color == "white" else "white"
+            # Castling needs the extra conditions checked by the King class
+            if abs(to_pos[1] - from_pos[1]) == 2:
+                if to_pos[1] == 6:
+                    return piece.can_castle_kingside(self.board, self)
+                return piece.can_castle_queenside(self.board, self)
+            # The king must not stay on a ray it is only blocking itself
+            return not self.is_square_attacked(to_pos, opponent_color, ignore=from_pos)
+
+        # En passant removes two pieces from a rank, so play it out instead
+        if isinstance(piece, Pawn) and to_pos == self.position.en_passant and from_pos[1] != to_pos[1]:
+            self.position.make_move(Move(from_pos, to_pos))
             king_safe = not self.is_in_check(piece.color)
-          
-            # Restore board state
-            self.board[from_pos[0]][from_pos[1]] = original_piece
-            self.board[to_pos[0]][to_pos[1]] = original_target
-            
-            # Restore has_moved states
-            if king_moved_state is not None:
-                piece.has_moved = king_moved_state
-            if rook_moved_state is not None:
-                piece.has_moved = rook_moved_state
-            
+            self.position.unmake_move()
             return king_safe
-                
-        return False
+
+        checkers, pins, blocks = analysis if analysis is not None else self.analyze(piece.color)
+        if blocks is not None and to_pos not in blocks:
+            return False
+        pin = pins.get(from_pos)
+        return pin is None or to_pos in pin
 
 
 class Rook(Piece):
+    __slots__ = ("has_moved",)
+
     def __init__(self, color):
         super().__init__(color)
         self.has_moved = False
@@ -164,102 +746,41 @@ class Rook(Piece):
     def symbol(self):
         return "wR" if self.color == "white" else "bR"
     
-    def move(self, board, from_pos, to_pos):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
-
-        if x1 == x2:  # Vertical movement
-            step = 1 if y1 < y2 else -1
-            for y in range(y1 + step, y2, step):
-                if board[y][x1] is not None:
-                    return False  # Path is blocked
-        elif y1 == y2:  # Horizontal movement
-            step = 1 if x1 < x2 else -1
-            for x in range(x1 + step, x2, step):
-                if board[y1][x] is not None:
-                    return False  # Path is blocked
-        else:
-            return False  
-        
-        # Check if we can capture/move to destination
-        can_move = self.capture_move(board, from_pos, to_pos)
-        if can_move:
-            self.has_moved = True
-                
-        return can_move
+    def moves(self, board, pos):
+        return self.slide_moves(board, pos, ROOK_DIRECTIONS)
 
 
 class Pawn(Piece):     
+    __slots__ = ()
+
     def symbol(self):
         return "wP" if self.color == "white" else "bP"
     
-    def move(self, board, from_pos, to_pos):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
-
-        step = -1 if self.color == "white" else 1  
-
-        # Single step forward
-        if x2 == x1 and y2 == y1 + step:
-            if board[y2][x2] is None:
-                board[y2][x2] = board[y1][x1]
-                board[y1][x1] = None
-                
-                # Checking for pawn promotion
-                if (self.color == "white" and y2 == 0) or (self.color == "black" and y2 == 7):
-                    self.promote(board, to_pos)
-
-                return True
-            else:
-                return False
-
-        # Double step from starting position
+    def moves(self, board, pos):
+        y1, x1 = pos
+        step = -1 if self.color == "white" else 1
         start_row = 6 if self.color == "white" else 1
-        if x2 == x1 and y1 == start_row and y2 == y1 + 2*step:
-            if board[y1 + step][x1] is None and board[y2][x2] is None:
-                board[y2][x2] = board[y1][x1]
-                board[y1][x1] = None
-                return True
-            else:
-                return False
-
-        # Diagonal capture
-        if abs(x2 - x1) == 1 and y2 == y1 + step:
-            target = board[y2][x2]
-            if target is not None and target.color != self.color:
-                board[y2][x2] = board[y1][x1]
-                board[y1][x1] = None
-                
-                if (self.color == "white" and y2 == 0) or (self.color == "black" and y2 == 7):
-                    self.promote(board, to_pos)
+        y2 = y1 + step
+        if not 0 <= y2 < 8:
+            return
 
-                return True
-            else: 
-                return False
-                
-        return False
+        # Forward pushes
+        if board[y2][x1] is None:
+            yield (y2, x1)
+            if y1 == start_row and board[y2 + step][x1] is None:
+                yield (y2 + step, x1)
 
-    def promote(self, board, pos):
-        print(f"Pawn reached promotion!")
-        while True:
-            choice = input("Choose piece for promotion (q, r, b, n): ").lower()
-            if choice == "q":
-                board[pos[0]][pos[1]] = Queen(self.color)
-                break
-            elif choice == "r":
-                board[pos[0]][pos[1]] = Rook(self.color)
-                break
-            elif choice == "b":
-                board[pos[0]][pos[1]] = Bishop(self.color)
-                break
-            elif choice == "n":
-                board[pos[0]][pos[1]] = Knight(self.color)
-                break
-            else:
-                print("Invalid choice. Please choose: q, r, b, or n.")
+        # Diagonal captures
+        for x2 in (x1 - 1, x1 + 1):
+            if 0 <= x2 < 8:
+                target = board[y2][x2]
+                if target is not None and target.color != self.color:
+                    yield (y2, x2)
 
 
 class King(Piece):
+    __slots__ = ("has_moved",)
+
     def __init__(self, color):
         super().__init__(color)
         self.has_moved = False
@@ -267,6 +788,18 @@ class King(Piece):
     def symbol(self):
         return "wK" if self.color == "white" else "bK"
     
+    def moves(self, board, pos):
+        yield from self.step_moves(board, pos, KING_OFFSETS)
+
+        # Castling candidates, the full conditions are checked by CheckMate.leaves_king_safe
+        y1, x1 = pos
+        row = 7 if self.color == "white" else 0
+        if not self.has_moved and pos == (row, 4):
+            if board[row][5] is None and board[row][6] is None:
+                yield (row, 6)
+            if board[row][1] is None and board[row][2] is None and board[row][3] is None:
+                yield (row, 2)
+
     def can_castle_kingside(self, board, rules=None):
         """Check if kingside castling is possible"""
         row = 7 if self.color == "white" else 0
@@ -285,30 +818,10 @@ class King(Piece):
             
         # King must not be in check, and must not pass through or end in check
         if rules:
-            # Check current position
-            if rules.is_in_check(self.color):
-                return False
-                
-            # Simulate king on f-file
-            original_king = board[row][4]
-            board[row][4] = None
-            board[row][5] = self
-            in_check_f = rules.is_in_check(self.color)
-            board[row][5] = None
-            board[row][4] = original_king
-            
-            if in_check_f:
-                return False
-                
-            # Simulate king on g-file  
-            board[row][4] = None
-            board[row][6] = self
-            in_check_g = rules.is_in_check(self.color)
-            board[row][6] = None
-            board[row][4] = original_king
-            
-            if in_check_g:
-                return False
+            opponent_color = "black" if self.color == "white" else "white"
+            for x in (4, 5, 6):
+                if rules.is_square_attacked((row, x), opponent_color):
+                    return False
                 
         return True
     
@@ -330,194 +843,46 @@ class King(Piece):
             
         # King must not be in check, and must not pass through or end in check
         if rules:
-            # Check current position
-            if rules.is_in_check(self.color):
-                return False
-                
-            # Simulate king on d-file
-            original_king = board[row][4]
-            board[row][4] = None
-            board[row][3] = self
-            in_check_d = rules.is_in_check(self.color)
-            board[row][3] = None
-            board[row][4] = original_king
-            
-            if in_check_d:
-                return False
-                
-            # Simulate king on c-file  
-            board[row][4] = None
-            board[row][2] = self
-            in_check_c = rules.is_in_check(self.color)
-            board[row][2] = None
-            board[row][4] = original_king
-            
-            if in_check_c:
-                return False
-                
-        return True
-
-    def execute_castle_kingside(self, board):
-        """Execute kingside castling"""
-        row = 7 if self.color == "white" else 0
-        
-        # Move king
-        board[row][6] = self
-        board[row][4] = None
-        
-        # Move rook
-        rook = board[row][7]
-        board[row][5] = rook
-        board[row][7] = None
-        
-        # Update moved flags
-        self.has_moved = True
-        rook.has_moved = True
-        
-    def execute_castle_queenside(self, board):
-        """Execute queenside castling"""
-        row = 7 if self.color == "white" else 0
-        
-        # Move king
-        board[row][2] = self
-        board[row][4] = None
-        
-        # Move rook
-        rook = board[row][0]
-        board[row][3] = rook
-        board[row][0] = None
-        
-        # Update moved flags
-        self.has_moved = True
-        rook.has_moved = True
-
-    def move(self, board, from_pos, to_pos, rules=None, check_only=False):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
-        
-        # Normal king move (one square in any direction)
-        if abs(x2 - x1) <= 1 and abs(y2 - y1) <= 1:
-            if y1 == y2 and x1 == x2:
-                return False  # Cannot move to same position
-            
-            # Checking if moving next to opponent king
             opponent_color = "black" if self.color == "white" else "white"
-            for row in range(8):
-                for col in range(8):
-                    piece = board[row][col]
-                    if (piece is not None and 
-                        isinstance(piece, King) and 
-                        piece.color == opponent_color):
-                        # Kings cannot be adjacent
-                        if abs(y2 - row) <= 1 and abs(x2 - col) <= 1:
-                            return False
-                        break 
-
-            can_move = self.capture_move(board, from_pos, to_pos)
-            if can_move and not check_only:
-                self.has_moved = True
-
-            return can_move
-            
-        # Castling move (king moves 2 squares horizontally)
-        elif y1 == y2 and abs(x2 - x1) == 2:
-            row = 7 if self.color == "white" else 0
-            
-            if y1 != row:  # King must be on home rank
-                return False
+            for x in (4, 3, 2):
+                if rules.is_square_attacked((row, x), opponent_color):
+                    return False
                 
-            if x2 == 6:  # Kingside castling (e1-g1 or e8-g8)
-                if self.can_castle_kingside(board, rules):
-                    if not check_only:
-                        self.execute_castle_kingside(board)
-                    return True
-                    
-            elif x2 == 2:  # Queenside castling (e1-c1 or e8-c8)
-                if self.can_castle_queenside(board, rules):
-                    if not check_only:
-                        self.execute_castle_queenside(board)
-                    return True
-                    
-            return False
-        else:
-            return False
+        return True
 
 
 class Bishop(Piece):
+    __slots__ = ()
+
     def symbol(self):
         return "wB" if self.color == "white" else "bB"
     
-    def move(self, board, from_pos, to_pos):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
-
-        # Must move diagonally
-        if abs(x2 - x1) != abs(y2 - y1):
-            return False
-
-        step_y = 1 if y2 > y1 else -1
-        step_x = 1 if x2 > x1 else -1
-
-        y, x = y1 + step_y, x1 + step_x
-        while y != y2 and x != x2:
-            if board[y][x] is not None:
-                return False  # Path is blocked
-            y += step_y
-            x += step_x
-
-        return self.capture_move(board, from_pos, to_pos)
+    def moves(self, board, pos):
+        return self.slide_moves(board, pos, BISHOP_DIRECTIONS)
 
 
 class Queen(Piece):
+    __slots__ = ()
+
     def symbol(self):
         return "wQ" if self.color == "white" else "bQ"
     
-    def move(self, board, from_pos, to_pos):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
-        
-        # Vertical movement (like rook)
-        if x1 == x2: 
-            step = 1 if y1 < y2 else -1
-            for y in range(y1 + step, y2, step):
-                if board[y][x1] is not None:
-                    return False  # Path is blocked
-        # Horizontal movement (like rook)
-        elif y1 == y2:  
-            step = 1 if x1 < x2 else -1
-            for x in range(x1 + step, x2, step):
-                if board[y1][x] is not None:
-                    return False  # Path is blocked
-                
-        # Diagonal movement (like bishop)
-        elif abs(x2 - x1) == abs(y2 - y1): 
-            step_y = 1 if y2 > y1 else -1
-            step_x = 1 if x2 > x1 else -1
-            y, x = y1 + step_y, x1 + step_x
-            while y != y2 and x != x2:
-                if board[y][x] is not None:
-                    return False  # Path is blocked
-                y += step_y
-                x += step_x
-        else:
-            return False  # Invalid move pattern
-
-        return self.capture_move(board, from_pos, to_pos)
+    def moves(self, board, pos):
+        return self.slide_moves(board, pos, QUEEN_DIRECTIONS)
 
 
 class Knight(Piece):
+    __slots__ = ()
+
     def symbol(self):
         return "wN" if self.color == "white" else "bN"
     
-    def move(self, board, from_pos, to_pos):
-        y1, x1 = from_pos
-        y2, x2 = to_pos
+    def moves(self, board, pos):
+        return self.step_moves(board, pos, KNIGHT_OFFSETS)
 
-        # Knight moves in L-shape: 2+1 or 1+2
-        if (abs(x2 - x1) == 2 and abs(y2 - y1) == 1) or (abs(x2 - x1) == 1 and abs(y2 - y1) == 2):
-            return self.capture_move(board, from_pos, to_pos)
-        else:
-            return False
+
+PROMOTION_PIECES = {"q": Queen, "r": Rook, "b": Bishop, "n": Knight}
+FEN_PIECES = {"k": King, "p": Pawn, **PROMOTION_PIECES}
 
 
 def user_to_matrix(pos):
@@ -533,6 +898,11 @@ def user_to_matrix(pos):
     return 8 - int(y), letters.index(x)  # Convert to (row, col) where row 0 = rank 8
 
 
+def matrix_to_user(pos):
+    y, x = pos
+    return "abcdefgh"[x] + str(8 - y)
+
+
 def is_valid_position(pos):
     if len(pos) != 2:
         return False
@@ -540,11 +910,75 @@ def is_valid_position(pos):
     return x in 'abcdefgh' and y in '12345678'
 
 
-def main():
-    board = Board()
-    board.setup()
-    rules = CheckMate(board)
-    turn = "white" 
+def ask_promotion():
+    print(f"Pawn reached promotion!")
+    while True:
+        choice = input("Choose piece for promotion (q, r, b, n): ").lower()
+        if choice in PROMOTION_PIECES:
+            return choice
+        print("Invalid choice. Please choose: q, r, b, or n.")
+
+
+def read_fens(path):
+    """Yield the FEN strings of a file one line at a time ("-" reads stdin).
+    Blank lines and lines starting with # are skipped."""
+    stream = sys.stdin if path == "-" else open(path)
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def load_positions(path, use_bitboard=False):
+    """Lazily yield a (board, rules) pair for every FEN line of a file"""
+    for number, fen in enumerate(read_fens(path), start=1):
+        try:
+            yield new_game(fen, use_bitboard)
+        except ValueError as error:
+            raise ValueError(f"{path}, position {number}: {error}") from None
+
+
+def new_game(fen=None, use_bitboard=False):
+    """Return a (board, rules) pair for the starting position or a FEN"""
+    if use_bitboard:
+        import bitboard
+        board_class, rules_class = bitboard.BitBoard, bitboard.BitCheckMate
+    else:
+        board_class, rules_class = Board, CheckMate
+    if fen is None:
+        board = board_class()
+        board.setup()
+    else:
+        board = board_class.from_fen(fen)
+    return board, rules_class(board)
+
+
+GAME_END_MESSAGES = {"checkmate": "Checkmate! {winner} wins!",
+                     "stalemate": "Stalemate! The game is a draw.",
+                     "repetition": "Threefold repetition! The game is a draw.",
+                     "fifty_moves": "Fifty moves without a capture or pawn move! The game is a draw."}
+
+
+def main(use_bitboard=False, engine_color=None, movetime=1.0, hash_mb=16, fen=None, book_path=None,
+         tablebase_path=None):
+    board, rules = new_game(fen, use_bitboard)
+    if tablebase_path is not None:
+        import tablebase
+        rules.tablebase = tablebase.Tablebase(tablebase_path)
+    engine = None
+    opening_book = None
+    if engine_color is not None:
+        import engine as engine_module
+        from transposition import TranspositionTable
+        engine = engine_module.Engine(board, rules, TranspositionTable(hash_mb))
+        if book_path is not None:
+            import book
+            opening_book = book.OpeningBook(book_path)
+    turn = board.turn
 
     print("Welcome to Chess!")
     print("Enter moves in chess notation (e.g., 'e2' to 'e4')")
@@ -555,18 +989,37 @@ def main():
         board.show_board()
         print(f"\n{turn.capitalize()}'s turn.")
 
-        # Check for check/checkmate/stalemate
+        # Legal moves are generated once per turn and reused to validate input
+        legal = rules.legal_moves(turn)
+
+        # Check for checkmate, stalemate and draws
+        status, _ = rules.game_status(legal)
+        if status != "playing":
+            print(GAME_END_MESSAGES[status].format(winner=("black" if turn == "white" else "white").capitalize()))
+            break
         if rules.is_in_check(turn):
-            if not rules.has_legal_moves(turn):
-                opponent = "black" if turn == "white" else "white"
-                print(f"Checkmate! {opponent.capitalize()} wins!")
-                break
+            print(f"Warning! {turn.capitalize()} is in check!")
+
+        known = rules.probe_tablebase()
+        if known is not None:
+            result, plies = known
+            if result == "draw":
+                print("Tablebase: the position is a draw.")
             else:
-                print(f"Warning! {turn.capitalize()} is in check!")
-        else:
-            if not rules.has_legal_moves(turn):
-                print("Stalemate! The game is a draw.")
-                break
+                winner = turn if result == "win" else ("black" if turn == "white" else "white")
+                print(f"Tablebase: {winner.capitalize()} mates in {(plies + 1) // 2} moves.")
+            break
+
+        if turn == engine_color:
+            move = opening_book.choose(rules) if opening_book is not None else None
+            if move is not None:
+                print(f"Engine plays {move!r} (book)\n")
+            else:
+                move = engine.search(time_limit=movetime)
+                print(f"Engine plays {move!r}\n")
+            board.make_move(move)
+            turn = "black" if turn == "white" else "white"
+            continue
 
         # Get user input
         user_from = input("Enter piece position (e.g., e2): ").strip()
@@ -601,17 +1054,12 @@ def main():
             continue
 
         # Execute move if legal
-        if rules.is_legal_move(piece, from_pos, to_pos):
-            move_success = False
-            if isinstance(piece, King):
-                move_success = piece.move(board.board, from_pos, to_pos, rules=rules)
-            else:
-                move_success = piece.move(board.board, from_pos, to_pos)
-            
-            if move_success:
-                turn = "black" if turn == "white" else "white"
-            else:
-                print("Invalid move. Try again.")
+        move = Move(from_pos, to_pos)
+        if isinstance(piece, Pawn) and to_pos[0] in (0, 7) and Move(from_pos, to_pos, "q") in legal:
+            move.promotion = ask_promotion()
+        if move in legal:
+            board.make_move(move)
+            turn = "black" if turn == "white" else "white"
         else:
             print("Invalid move (would leave king in check or illegal move). Try again.")
 
@@ -619,4 +1067,127 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Modules that "import chess" must share this copy, not load a second one
+    sys.modules.setdefault("chess", sys.modules[__name__])
+
+    parser = argparse.ArgumentParser(description="Play chess in the terminal")
+    parser.add_argument("--bitboard", action="store_true", help="use the bitboard backend")
+    parser.add_argument("--engine", choices=["white", "black"], help="let the engine play this color")
+    parser.add_argument("--movetime", type=float, default=1.0, help="engine time per move in seconds")
+    parser.add_argument("--hash", type=int, default=16, metavar="MB", help="engine transposition table size")
+    parser.add_argument("--book", help="opening book file for the engine (see the book command)")
+    parser.add_argument("--tablebase", help="endgame tablebase file to settle KQK, KRK and KPK games "
+                                            "(see the tablebase command)")
+    parser.add_argument("--perft", type=int, metavar="N", help="count the leaf nodes N plies deep and exit")
+    parser.add_argument("--fen", help="position to play from or run --perft on (default: starting position)")
+    parser.add_argument("--perft-suite", action="store_true",
+                        help="check the move generator against known perft counts "
+                             "(up to --perft plies, default 3)")
+    commands = parser.add_subparsers(dest="command")
+    validate_parser = commands.add_parser("validate", help="replay the games of a PGN file and report illegal moves")
+    validate_parser.add_argument("pgn", help="PGN file")
+    validate_parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    validate_parser.add_argument("--mmap", action="store_true", help="read the file through mmap")
+    analyze_parser = commands.add_parser("analyze", help="report check, mate, stalemate and legal moves as JSONL")
+    analyze_parser.add_argument("fens", help="file with one FEN per line (- for stdin)")
+    analyze_parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    analyze_parser.add_argument("--output", help="JSONL file to write (default: stdout)")
+    book_parser = commands.add_parser("book", help="compile an opening book from a PGN file")
+    book_parser.add_argument("pgn", help="PGN file")
+    book_parser.add_argument("output", help="book file to write")
+    book_parser.add_argument("--plies", type=int, default=20, help="plies of each game to include")
+    book_parser.add_argument("--min-games", type=int, default=1, help="leave out moves played in fewer games")
+    book_parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    tablebase_parser = commands.add_parser("tablebase", help="generate the KQK, KRK and KPK tablebase")
+    tablebase_parser.add_argument("output", help="tablebase file to write")
+    tablebase_parser.add_argument("--verify", type=int, default=1000, metavar="N",
+                                  help="check N random positions against the move rules (0 to skip)")
+    eval_parser = commands.add_parser("eval", help="evaluate --fen, or benchmark the evaluation")
+    eval_parser.add_argument("--bench", type=float, metavar="SECONDS",
+                             help="report evaluations per second over sample positions")
+    match_parser = commands.add_parser("match", help="play engine configurations against each other")
+    match_parser.add_argument("--config-a", default="", metavar="SPEC",
+                              help="engine A settings, e.g. movetime=0.1,depth=4,nodes=20000,hash=16,mobility=1")
+    match_parser.add_argument("--config-b", default="", metavar="SPEC", help="engine B settings")
+    match_parser.add_argument("--games", type=int, default=100, help="maximum number of games")
+    match_parser.add_argument("--openings", help="file with one opening FEN per line (default: start position)")
+    match_parser.add_argument("--workers", type=int, default=1, help="number of worker processes")
+    match_parser.add_argument("--max-plies", type=int, default=300, help="adjudicate longer games as draws")
+    match_parser.add_argument("--pgn", help="PGN file to append the games to")
+    match_parser.add_argument("--results", help="JSONL file to append one result per game to")
+    match_parser.add_argument("--sprt", type=float, nargs=2, metavar=("ELO0", "ELO1"),
+                              help="stop once an SPRT of ELO1 against ELO0 is decided")
+    match_parser.add_argument("--alpha", type=float, default=0.05, help="SPRT false positive rate")
+    match_parser.add_argument("--beta", type=float, default=0.05, help="SPRT false negative rate")
+    search_parser = commands.add_parser("search", help="fixed-depth engine analysis split across processes")
+    search_parser.add_argument("--depth", type=int, default=4, help="search depth in plies")
+    search_parser.add_argument("--threads", type=int, default=1, help="number of worker processes")
+    search_parser.add_argument("--compare", action="store_true",
+                               help="also run the single-core search and report the speedup")
+    serve_parser = commands.add_parser("serve", help="host games over a JSON-lines socket protocol")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    serve_parser.add_argument("--workers", type=int, help="rules/engine worker processes (default: CPU count)")
+    args = parser.parse_args()
+    if args.perft is not None and args.perft < 1:
+        parser.error("--perft needs at least 1 ply")
+    if args.command == "search" and (args.depth < 1 or args.threads < 1):
+        parser.error("search needs --depth and --threads of at least 1")
+
+    if args.command == "match":
+        import tournament
+        tournament.run_match(tournament.parse_config(args.config_a), tournament.parse_config(args.config_b),
+                             games=args.games, openings=tournament.openings_list(args.openings),
+                             workers=args.workers, max_plies=args.max_plies, pgn_path=args.pgn,
+                             results_path=args.results, sprt=args.sprt, alpha=args.alpha, beta=args.beta)
+    elif args.command == "eval":
+        import evaluation
+        if args.bench:
+            evaluation.benchmark(args.bench)
+        else:
+            board, rules = new_game(args.fen, args.bitboard)
+            print(f"Material + tables: middlegame {board.middlegame_score}, endgame {board.endgame_score}, "
+                  f"phase {board.phase}/{MAX_PHASE}")
+            print(f"Pawn structure: {evaluation.pawn_terms(board)}, mobility: {evaluation.mobility_terms(board)}")
+            print(f"Score for {board.turn}: {evaluation.Evaluator().evaluate(board)}")
+    elif args.command == "tablebase":
+        import tablebase
+        tablebase.build(args.output)
+        if args.verify:
+            errors = tablebase.verify(tablebase.Tablebase(args.output), args.verify)
+            sys.exit(1 if errors else 0)
+    elif args.command == "book":
+        import book
+        book.build(args.pgn, args.output, plies=args.plies, workers=args.workers, min_games=args.min_games)
+    elif args.command == "search":
+        import parallel
+        if args.compare:
+            parallel.compare(args.fen, args.depth, args.threads, args.hash)
+        else:
+            move, score, nodes = parallel.parallel_search(args.fen, args.depth, args.threads, args.hash)
+            print(f"Best move {move!r} score {score} ({nodes} nodes)")
+    elif args.command == "serve":
+        import server
+        server.serve(args.host, args.port, workers=args.workers, hash_mb=args.hash)
+    elif args.command == "analyze":
+        import analysis
+        if args.output:
+            with open(args.output, "w") as output:
+                analysis.analyze_file(args.fens, workers=args.workers, output=output,
+                                      use_bitboard=args.bitboard)
+        else:
+            analysis.analyze_file(args.fens, workers=args.workers, use_bitboard=args.bitboard)
+    elif args.command == "validate":
+        import pgn
+        games, illegal, plies = pgn.validate(args.pgn, workers=args.workers, use_mmap=args.mmap)
+        sys.exit(1 if illegal else 0)
+    elif args.perft_suite:
+        import perft
+        passed = perft.run_suite(max_depth=args.perft or 3, use_bitboard=args.bitboard)
+        sys.exit(0 if passed else 1)
+    elif args.perft is not None:
+        import perft
+        perft.report(args.perft, fen=args.fen, use_bitboard=args.bitboard)
+    else:
+        main(use_bitboard=args.bitboard, engine_color=args.engine, movetime=args.movetime,
+             hash_mb=args.hash, fen=args.fen, book_path=args.book, tablebase_path=args.tablebase)
\ No newline at end of file
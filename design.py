@@ -1,32 +1,108 @@
+import argparse
+import queue
+import threading
 import tkinter as tk
-from PIL import Image, ImageTk
+import traceback
 import chess  # your updated chess.py
+import engine
+import sprites
+from transposition import TranspositionTable
+
+POLL_MS = 20  # how often Tk picks up finished background jobs
+RESIZE_MS = 150  # wait for the window to settle before rescaling
+
+
+def copy_board(board):
+    # Jobs get their own board, so the GUI can keep playing on the original
+    copy = chess.Board.from_snapshot(board.snapshot())
+    copy.position_counts = dict(board.position_counts)
+    return copy, chess.CheckMate(copy)
+
+
+def analyze_turn(board, rules, stop):
+    """Legal moves and game-end status for the side to move"""
+    moves = rules.legal_moves(board.turn)
+    in_check = rules.is_in_check(board.turn)
+    status, _ = rules.game_status(moves)
+    end = None
+    if status != "playing":
+        winner = "black" if board.turn == "white" else "white"
+        end = (chess.GAME_END_MESSAGES[status].format(winner=winner.capitalize()),
+               "green" if status == "checkmate" else "blue")
+    return moves, in_check, end
+
+
+def engine_search(board, rules, stop, table, movetime=None):
+    """Best move within movetime seconds; without movetime it ponders until stopped"""
+    return engine.Engine(board, rules, table).search(time_limit=movetime, stop=stop)
+
+
+class BackgroundWorker:
+    """Runs rules and engine jobs on one thread, callbacks run on the Tk thread.
+    A job that raises is reported to on_error (also on the Tk thread) instead."""
+
+    def __init__(self, root, on_error=None):
+        self.root = root
+        self.on_error = on_error
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = []  # stop events of the jobs not finished yet
+        threading.Thread(target=self.run, daemon=True).start()
+        self.root.after(POLL_MS, self.poll)
+
+    def submit(self, function, board, callback=None, *args):
+        stop = threading.Event()
+        self.pending.append(stop)
+        self.jobs.put((function, copy_board(board), args, callback, stop))
+
+    def cancel(self):
+        # Stops a running search and drops the results of every job submitted so far
+        for stop in self.pending:
+            stop.set()
+        self.pending = []
+
+    def run(self):
+        while True:
+            function, (board, rules), args, callback, stop = self.jobs.get()
+            if stop.is_set():
+                continue
+            try:
+                result = function(board, rules, stop, *args)
+            except Exception as error:
+                # Keep the thread alive for the next job, the GUI reports the failure
+                traceback.print_exc()
+                self.results.put((self.on_error, error, stop))
+                continue
+            self.results.put((callback, result, stop))
+
+    def poll(self):
+        while not self.results.empty():
+            callback, result, stop = self.results.get()
+            if stop in self.pending:
+                self.pending.remove(stop)
+            if callback is not None and not stop.is_set():
+                callback(result)
+        self.root.after(POLL_MS, self.poll)
+
 
 class ChessGUI:
-    def __init__(self, root):
+    def __init__(self, root, engine_color=None, movetime=1.0, animation_ms=150, ponder=True):
         self.root = root
         self.root.title("Chess Game")
         self.size = 768
         self.square = self.size // 8
 
-        self.canvas = tk.Canvas(root, width=self.size, height=self.size)
-        self.canvas.pack()
-
         self.message = tk.Label(root, text="", font=("Arial", 14), fg="red")
-        self.message.pack()
+        self.message.pack(side="bottom")
+        self.canvas = tk.Canvas(root, width=self.size, height=self.size, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
 
-        # Load board image
-        board_img = Image.open("assets/board.png").resize((self.size, self.size), Image.Resampling.LANCZOS)
-        self.board_photo = ImageTk.PhotoImage(board_img)
-        self.canvas.create_image(0, 0, image=self.board_photo, anchor="nw")
-
-        # Load piece images
-        names = ['wR','wN','wB','wQ','wK','wP','bR','bN','bB','bQ','bK','bP']
-        self.pieces = {
-            name: ImageTk.PhotoImage(
-                Image.open(f"assets/{name}.png").resize((self.square, self.square), Image.Resampling.LANCZOS)
-            ) for name in names
-        }
+        # Board and piece images come pre-scaled from the sprite cache
+        self.board_photo, self.pieces = sprites.load_set(self.size)
+        self.board_item = self.canvas.create_image(0, 0, image=self.board_photo, anchor="nw")
+        self.resize_job = None
+        self.target_size = self.size  # board size that fits the window, see resize
+        self.render_thread = None  # scales the sprites of a size not in the cache yet
 
         # Game logic
         self.board = chess.Board()
@@ -34,24 +110,166 @@ class ChessGUI:
         self.rules = chess.CheckMate(self.board)
         self.turn = "white"
         self.selected = None
+        self.engine_color = engine_color
+        self.movetime = movetime
+        self.ponder = ponder and engine_color is not None
+        self.table = TranspositionTable()  # shared by the engine searches and pondering
+        self.worker = BackgroundWorker(root, self.on_worker_error)
+        self.game_over = False
+
+        # Canvas state: one image item per occupied square, updated only where the board changed
+        self.items = {}  # (r, c) -> canvas item id
+        self.drawn = {}  # (r, c) -> symbol shown there
+        self.animation_ms = animation_ms  # 0 turns move animation off
+        self.animation = None  # (item, to_pos, after id) of the running animation
+        self.legal = None  # from_pos -> {to_pos: [moves]} for the side to move, None while analyzing
 
         self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Configure>", self.on_configure)
         self.redraw()
+        self.start_turn()
+
+    def on_configure(self, event):
+        # Rescale once the window stops changing, not on every intermediate size
+        if self.resize_job is not None:
+            self.root.after_cancel(self.resize_job)
+        self.resize_job = self.root.after(RESIZE_MS, self.resize, min(event.width, event.height))
+
+    def resize(self, size=None):
+        # size is the new window size, None tries the last one again after a render
+        self.resize_job = None
+        if size is not None:
+            self.target_size = sprites.snap(size)
+        if self.render_thread is not None or self.target_size == self.size:
+            return
+        if sprites.is_cached(self.target_size):
+            self.apply_size(self.target_size)
+            return
+
+        # Scale on a thread, the current sprites stay up until the new ones are on disk
+        errors = []
+
+        def render(size=self.target_size):
+            try:
+                sprites.render_set(size)
+            except Exception as error:
+                errors.append(error)
+        self.render_thread = threading.Thread(target=render, daemon=True)
+        self.render_thread.start()
+        self.root.after(POLL_MS, self.wait_for_render, errors)
+
+    def wait_for_render(self, errors):
+        if self.render_thread.is_alive():
+            self.root.after(POLL_MS, self.wait_for_render, errors)
+            return
+        self.render_thread = None
+        if errors:
+            self.target_size = self.size
+            self.show_message(f"Could not scale the images: {errors[0]}")
+            return
+        self.resize()
+
+    def apply_size(self, size):
+        # Only called for cached sizes, loading the PNG files is quick
+        self.finish_animation()
+        self.size = size
+        self.square = size // 8
+        self.board_photo, self.pieces = sprites.load_set(size)
+        self.canvas.itemconfig(self.board_item, image=self.board_photo)
+        for (r, c), item in self.items.items():
+            self.canvas.coords(item, c * self.square, r * self.square)
+            self.canvas.itemconfig(item, image=self.pieces[self.drawn[(r, c)]])
+        self.canvas.delete("highlight")
+        if self.selected is not None:
+            self.highlight_selected_piece(*self.selected)
+
+    def redraw(self, move=None):
+        # With a move, its piece item slides to the target square instead of being recreated
+        if move is not None and move.from_pos in self.items:
+            self.finish_animation()
+            item = self.items.pop(move.from_pos)
+            symbol = self.drawn.pop(move.from_pos)
+            if move.to_pos in self.items:  # captured piece
+                self.canvas.delete(self.items.pop(move.to_pos))
+            self.items[move.to_pos] = item
+            self.drawn[move.to_pos] = symbol
+            self.animate(item, move.from_pos, move.to_pos)
 
-    def redraw(self):
-        self.canvas.delete("piece")
+        # Sync the remaining squares: castling rooks, en passant, promotions, undo
         for r in range(8):
             for c in range(8):
                 piece = self.board.board[r][c]
-                if piece:
-                    x, y = c * self.square, r * self.square
-                    symbol = piece.symbol()
-                    self.canvas.create_image(x, y, image=self.pieces[symbol], anchor="nw", tags="piece")
-#   1.	Clears the canvas.
-#	2.	Draws the board image again.
-#	3.	Draws all pieces in their new positions.
+                symbol = piece.symbol() if piece else None
+                if self.drawn.get((r, c)) == symbol:
+                    continue
+                item = self.items.get((r, c))
+                if symbol is None:
+                    self.canvas.delete(item)
+                    del self.items[(r, c)]
+                    del self.drawn[(r, c)]
+                    continue
+                if item is None:
+                    self.items[(r, c)] = self.canvas.create_image(
+                        c * self.square, r * self.square, image=self.pieces[symbol], anchor="nw", tags="piece")
+                else:
+                    self.canvas.itemconfig(item, image=self.pieces[symbol])
+                self.drawn[(r, c)] = symbol
+
+    def animate(self, item, from_pos, to_pos):
+        if not self.animation_ms:
+            self.canvas.coords(item, to_pos[1] * self.square, to_pos[0] * self.square)
+            return
+        frames = max(1, self.animation_ms // 15)
+        dx = (to_pos[1] - from_pos[1]) * self.square / frames
+        dy = (to_pos[0] - from_pos[0]) * self.square / frames
+        self.canvas.tag_raise(item)
+
+        def step(frame):
+            if frame == frames:
+                self.canvas.coords(item, to_pos[1] * self.square, to_pos[0] * self.square)
+                self.animation = None
+                return
+            self.canvas.move(item, dx, dy)
+            self.animation = (item, to_pos, self.root.after(15, step, frame + 1))
+        step(0)
+
+    def finish_animation(self):
+        # Snap a running animation to its target square
+        if self.animation is not None:
+            item, to_pos, after_id = self.animation
+            self.root.after_cancel(after_id)
+            self.canvas.coords(item, to_pos[1] * self.square, to_pos[0] * self.square)
+            self.animation = None
+
+    def legal_targets(self, from_pos):
+        # Filled in by on_analysis, empty while the turn is still being analyzed
+        return (self.legal or {}).get(from_pos, {})
+
+    def start_turn(self):
+        # Legal moves and game-end detection run on the worker, see on_analysis
+        self.legal = None
+        self.worker.submit(analyze_turn, self.board, self.on_analysis)
+
+    def on_analysis(self, result):
+        moves, in_check, end = result
+        self.legal = {}
+        for move in moves:
+            self.legal.setdefault(move.from_pos, {}).setdefault(move.to_pos, []).append(move)
+        if end is not None:
+            self.end_game(*end)
+            return
+        if in_check:
+            self.show_message(f"{self.turn.capitalize()} is in check!", "orange")
+        if self.turn == self.engine_color:
+            self.worker.submit(engine_search, self.board, self.on_engine_move, self.table, self.movetime)
+        elif self.ponder:
+            # Search on the player's time, the table keeps what it finds for the reply
+            self.worker.submit(engine_search, self.board, None, self.table)
 
 
+    def on_worker_error(self, error):
+        self.show_message(f"Background job failed: {error}", duration=10000)
+
     def show_message(self, text, color="red", duration=2000):
         self.message.config(text=text, fg=color)
         self.root.after(duration, lambda: self.message.config(text=""))
@@ -62,9 +280,63 @@ class ChessGUI:
             x, y, x + self.square, y + self.square,
             outline="#0000FF", width=3, tags="highlight"
         )
+        # Dots on the squares the piece can move to, rings on captures
+        radius = self.square // 8
+        for tr, tc in self.legal_targets((r, c)):
+            cx, cy = (tc + 0.5) * self.square, (tr + 0.5) * self.square
+            if self.board.board[tr][tc] is None:
+                self.canvas.create_oval(cx - radius, cy - radius, cx + radius, cy + radius,
+                                        fill="#3a7d44", outline="", tags="highlight")
+            else:
+                half = self.square / 2 - 3
+                self.canvas.create_oval(cx - half, cy - half, cx + half, cy + half,
+                                        outline="#3a7d44", width=4, tags="highlight")
+
+    def play(self, move):
+        self.worker.cancel()  # stop pondering, the position it searched is gone
+        self.board.make_move(move)
+        self.redraw(move)
+        self.turn = self.board.turn
+        self.start_turn()
+
+    def end_game(self, text, color):
+        self.show_message(text, color, duration=5000)
+        self.canvas.unbind("<Button-1>")
+        self.game_over = True
+
+    def close(self):
+        self.worker.cancel()
+        self.root.destroy()
+
+    def ask_promotion(self, color):
+        # Modal dialog with one button per promotion piece, queen if it is closed
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Promotion")
+        dialog.transient(self.root)
+        choice = tk.StringVar(value="q")
+        prefix = "w" if color == "white" else "b"
+        for letter in "qrbn":
+            def pick(letter=letter):
+                choice.set(letter)
+                dialog.destroy()
+            tk.Button(dialog, image=self.pieces[prefix + letter.upper()], command=pick).pack(side="left")
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        return choice.get()
+
+    def on_engine_move(self, move):
+        if move is not None and not self.game_over:
+            self.play(move)
 
     def on_click(self, event):
+        if self.turn == self.engine_color:
+            self.show_message("Wait for the engine to move!")
+            return
+        if self.legal is None:
+            return  # still analyzing the position
         r, c = event.y // self.square, event.x // self.square
+        if not (0 <= r < 8 and 0 <= c < 8):
+            return  # the window is larger than the board
 
         if self.selected is None:
             piece = self.board.board[r][c]
@@ -77,44 +349,37 @@ class ChessGUI:
         else:
             from_pos = self.selected
             to_pos = (r, c)
-            piece = self.board.board[from_pos[0]][from_pos[1]]
-
-            if self.rules.is_legal_move(piece, from_pos, to_pos): #is this move allowed for this piece?
-                moved = False
-                if isinstance(piece, chess.King):
-                    moved = piece.move(self.board.board, from_pos, to_pos, rules=self.rules)
-                else:
-                    moved = piece.move(self.board.board, from_pos, to_pos)
-
-                if moved:
-                    self.redraw()
-                    if self.rules.is_in_check(self.turn):
-                        self.show_message("You are still in check!", "orange")
-
-                    opponent = "black" if self.turn == "white" else "white"
-                    if self.rules.is_in_check(opponent):
-                        if not self.rules.has_legal_moves(opponent):
-                            self.show_message(f"Checkmate! {self.turn.capitalize()} wins!", "green", duration=5000)
-                            self.canvas.unbind("<Button-1>")
-                        else: 
-                            self.show_message(f"{opponent.capitalize()} is in check!", "orange")
-
-                    elif not self.rules.has_legal_moves(opponent):
-                        self.show_message("Stalemate! It's a draw!", "blue", duration=5000)
-                        self.canvas.unbind("<Button-1>")
-
-                    self.turn = opponent
-                else:
-                    self.show_message("Invalid move.")
-            else:
-                self.show_message("Illegal move.")
-
             self.selected = None
             self.canvas.delete("highlight")
+            piece = self.board.board[r][c]
+            if piece and piece.color == self.turn and to_pos != from_pos:
+                # Clicking another own piece switches the selection
+                self.selected = to_pos
+                self.highlight_selected_piece(r, c)
+                return
+
+            moves = self.legal_targets(from_pos).get(to_pos)
+            if moves:
+                move = moves[0]
+                if len(moves) > 1:  # one move per promotion piece
+                    choice = self.ask_promotion(self.turn)
+                    move = next(m for m in moves if m.promotion == choice)
+                self.play(move)
+            elif to_pos != from_pos:
+                self.show_message("Illegal move.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play chess in a window")
+    parser.add_argument("--engine", choices=["white", "black"], help="let the engine play this color")
+    parser.add_argument("--movetime", type=float, default=1.0, help="engine time per move in seconds")
+    parser.add_argument("--no-animation", action="store_true", help="move pieces without sliding them")
+    parser.add_argument("--no-ponder", action="store_true", help="do not let the engine think on your time")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = ChessGUI(root)
+    app = ChessGUI(root, engine_color=args.engine, movetime=args.movetime,
+                   animation_ms=0 if args.no_animation else 150, ponder=not args.no_ponder)
+    root.protocol("WM_DELETE_WINDOW", app.close)
     root.mainloop()
 
 
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# Alpha-beta search engine on top of the Board/CheckMate rules in chess.py
+
+import time
+
+import chess
+from evaluation import Evaluator
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
+
+MATE = 100000
+INFINITY = 1000000
+
+PIECE_VALUES = {"P": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+
+
+class SearchAborted(Exception):
+    pass
+
+
+# Mate scores are stored relative to the node, not the root, in the table
+def score_to_table(score, ply):
+    if score >= MATE - 1000:
+        return score + ply
+    if score <= -MATE + 1000:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    if score >= MATE - 1000:
+        return score - ply
+    if score <= -MATE + 1000:
+        return score + ply
+    return score
+
+
+class Engine:
+    def __init__(self, board, rules, table=None, evaluator=None):
+        self.board = board
+        self.rules = rules
+        self.table = table if table is not None else TranspositionTable()
+        self.evaluator = evaluator if evaluator is not None else Evaluator()
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stop = None  # threading.Event that aborts the search when set
+        self.killers = {}
+        self.history = {}
+
+    def is_capture(self, move):
+        y, x = move.to_pos
+        if self.board.board[y][x] is not None:
+            return True
+        return move.to_pos == self.board.en_passant and move.from_pos[1] != x and \
+            isinstance(self.board.board[move.from_pos[0]][move.from_pos[1]], chess.Pawn)
+
+    def order_moves(self, moves, ply, first=None):
+        board = self.board.board
+        killers = self.killers.get(ply, ())
+
+        def score(move):
+            if move == first:
+                return 3 * INFINITY
+            victim = board[move.to_pos[0]][move.to_pos[1]]
+            if victim is not None or self.is_capture(move):
+                # MVV-LVA: most valuable victim first, then least valuable attacker
+                attacker = board[move.from_pos[0]][move.from_pos[1]]
+                value = PIECE_VALUES[victim.symbol()[1]] if victim is not None else PIECE_VALUES["P"]
+                return 2 * INFINITY + 10 * value - PIECE_VALUES[attacker.symbol()[1]]
+            if move.promotion == "q":
+                return 2 * INFINITY
+            if move in killers:
+                return INFINITY
+            return self.history.get((move.from_pos, move.to_pos), 0)
+
+        moves.sort(key=score, reverse=True)
+        return moves
+
+    def check_limits(self):
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+        if self.stop is not None and self.stop.is_set():
+            raise SearchAborted()
+
+    def search(self, time_limit=None, node_limit=None, max_depth=64, verbose=False, stop=None):
+        """Return the best move found within the limits (None if there is no legal move).
+        time_limit is in seconds; at least depth 1 is always completed unless stop
+        (a threading.Event) is set, which ends the search from another thread."""
+        moves = self.rules.legal_moves(self.board.turn)
+        if not moves:
+            return None
+        start = time.perf_counter()
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stop = stop
+        self.killers = {}
+        self.history = {}
+        self.table.new_search()
+        stack_size = len(self.board.undo_stack)
+
+        best_move = moves[0]
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = self.search_root(moves, depth, best_move)
+            except SearchAborted:
+                # Unwind the moves that were on the board when the search stopped
+                while len(self.board.undo_stack) > stack_size:
+                    self.board.unmake_move()
+                break
+            best_move = move
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"depth {depth} score {score} nodes {self.nodes} "
+                      f"time {elapsed:.2f}s best {best_move!r} "
+                      f"hash hits {self.table.hit_rate():.1%} full {self.table.fill_ratio():.1%}")
+            if abs(score) >= MATE - max_depth:
+                break
+            # Limits only apply from depth 2 on, so there is always a move to play
+            if time_limit is not None:
+                self.deadline = start + time_limit
+                if time.perf_counter() >= self.deadline:
+                    break
+            if node_limit is not None:
+                self.node_limit = node_limit
+                if self.nodes >= node_limit:
+                    break
+        return best_move
+
+    def search_root(self, moves, depth, first):
+        alpha, beta = -INFINITY, INFINITY
+        best_move = None
+        for move in self.order_moves(moves, 0, first):
+            self.board.make_move(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, 1)
+            self.board.unmake_move()
+            if score > alpha or best_move is None:
+                alpha = score
+                best_move = move
+        self.table.store(self.board.hash, depth, EXACT, score_to_table(alpha, 0), best_move)
+        return alpha, best_move
+
+    def negamax(self, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.check_limits()
+
+        board = self.board
+        if board.repetition_count() > 1 or board.is_fifty_moves():
+            return 0
+
+        # Three pieces or fewer: the tablebase knows the exact result
+        if len(board.piece_squares["white"]) + len(board.piece_squares["black"]) <= 3:
+            known = self.rules.probe_tablebase()
+            if known is not None:
+                result, plies = known
+                if result == "draw":
+                    return 0
+                return MATE - ply - plies if result == "win" else -MATE + ply + plies
+
+        color = board.turn
+        in_check = self.rules.is_in_check(color)
+        if in_check:
+            depth += 1  # Check extension
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply)
+
+        # A deep enough result for this position may settle it without searching
+        original_alpha = alpha
+        table_move = None
+        entry = self.table.probe(board.hash)
+        if entry is not None:
+            table_depth, bound, table_score, table_move = entry
+            if table_depth >= depth:
+                table_score = score_from_table(table_score, ply)
+                if bound == EXACT:
+                    return table_score
+                if bound == LOWER and table_score >= beta:
+                    return table_score
+                if bound == UPPER and table_score <= alpha:
+                    return table_score
+
+        moves = self.rules.legal_moves(color)
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        best = -INFINITY
+        best_move = None
+        for move in self.order_moves(moves, ply, table_move):
+            capture = self.is_capture(move)
+            board.make_move(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+
+            if score > best:
+                best = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not capture:
+                    # Quiet moves that cut off are tried early in sibling positions
+                    killers = self.killers.setdefault(ply, [])
+                    if move not in killers:
+                        killers.insert(0, move)
+                        del killers[2:]
+                    key = (move.from_pos, move.to_pos)
+                    self.history[key] = self.history.get(key, 0) + depth * depth
+                break
+
+        if best <= original_alpha:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table.store(board.hash, depth, bound, score_to_table(best, ply), best_move)
+        return best
+
+    def quiescence(self, alpha, beta, ply):
+        # Only captures are searched so the evaluation is not taken mid-exchange
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self.check_limits()
+
+        stand_pat = self.evaluator.evaluate(self.board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = [move for move in self.rules.legal_moves(self.board.turn) if self.is_capture(move)]
+        for move in self.order_moves(captures, ply):
+            self.board.make_move(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            self.board.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Position evaluation for the engine: tapered material + piece-square tables, mobility
+# and pawn structure. Material and piece-square sums are kept by Board.put_piece and
+# remove_piece as moves are made and unmade, pawn terms are cached by the pawn hash.
+
+import random
+import time
+
+import chess
+import piece_square
+
+# Pseudo-legal move bonus per piece (middlegame, endgame) around a typical count
+MOBILITY_WEIGHTS = {"N": (4, 4, 4), "B": (5, 5, 6), "R": (2, 4, 7), "Q": (1, 2, 13)}
+DOUBLED_PAWN = (-10, -20)
+ISOLATED_PAWN = (-10, -15)
+# Passed pawn bonus by ranks advanced from the start square
+PASSED_PAWN = [(0, 0), (5, 10), (10, 20), (15, 35), (25, 60), (40, 100), (60, 150), (0, 0)]
+
+
+def full_scores(board):
+    """(middlegame, endgame, phase, pawn hash) recomputed by scanning the board,
+    the values Board keeps incrementally"""
+    middlegame = endgame = phase = pawn_hash = 0
+    for color in ("white", "black"):
+        for y, x in board.piece_squares[color]:
+            symbol = board.board[y][x].symbol()
+            middlegame += piece_square.MIDDLEGAME_SCORES[symbol][y * 8 + x]
+            endgame += piece_square.ENDGAME_SCORES[symbol][y * 8 + x]
+            phase += piece_square.PHASE_WEIGHTS[symbol[1]]
+            if symbol[1] == "P":
+                pawn_hash ^= chess.PIECE_KEYS[symbol][y * 8 + x]
+    return middlegame, endgame, phase, pawn_hash
+
+
+def pawn_terms(board):
+    """Doubled, isolated and passed pawns as (middlegame, endgame), white minus black"""
+    pawns = {"white": [], "black": []}
+    for color in ("white", "black"):
+        for y, x in board.piece_squares[color]:
+            if board.board[y][x].symbol()[1] == "P":
+                pawns[color].append((y, x))
+
+    middlegame = endgame = 0
+    for color, sign in (("white", 1), ("black", -1)):
+        files = [x for _, x in pawns[color]]
+        enemy = pawns["black" if color == "white" else "white"]
+        for y, x in pawns[color]:
+            terms = []
+            if files.count(x) > 1:
+                terms.append(DOUBLED_PAWN)
+            if x - 1 not in files and x + 1 not in files:
+                terms.append(ISOLATED_PAWN)
+            # Passed: no enemy pawn ahead on this or a neighbouring file
+            ahead = (lambda row: row < y) if color == "white" else (lambda row: row > y)
+            if not any(abs(ex - x) <= 1 and ahead(ey) for ey, ex in enemy):
+                terms.append(PASSED_PAWN[6 - y if color == "white" else y - 1])
+            for term_middlegame, term_endgame in terms:
+                middlegame += sign * term_middlegame
+                endgame += sign * term_endgame
+    return middlegame, endgame
+
+
+def _targets(offsets, slide):
+    # Per square, the rays (or single steps) a piece walks along, as lists of (y, x)
+    table = {}
+    for y in range(8):
+        for x in range(8):
+            rays = []
+            for dy, dx in offsets:
+                ray = []
+                ny, nx = y + dy, x + dx
+                while 0 <= ny < 8 and 0 <= nx < 8:
+                    ray.append((ny, nx))
+                    if not slide:
+                        break
+                    ny, nx = ny + dy, nx + dx
+                if ray:
+                    rays.append(ray)
+            table[(y, x)] = rays
+    return table
+
+
+MOBILITY_RAYS = {"N": _targets(chess.KNIGHT_OFFSETS, False), "B": _targets(chess.BISHOP_DIRECTIONS, True),
+                 "R": _targets(chess.ROOK_DIRECTIONS, True), "Q": _targets(chess.QUEEN_DIRECTIONS, True)}
+
+
+def mobility_terms(board):
+    """Pseudo-legal moves of knights, bishops, rooks and queens as (middlegame, endgame)"""
+    middlegame = endgame = 0
+    grid = board.board
+    for color, sign in (("white", 1), ("black", -1)):
+        for pos in board.piece_squares[color]:
+            kind = grid[pos[0]][pos[1]].symbol()[1]
+            rays = MOBILITY_RAYS.get(kind)
+            if rays is None:
+                continue
+            count = 0
+            for ray in rays[pos]:
+                for y, x in ray:
+                    target = grid[y][x]
+                    if target is None:
+                        count += 1
+                    else:
+                        if target.color != color:
+                            count += 1
+                        break
+            weight_middlegame, weight_endgame, typical = MOBILITY_WEIGHTS[kind]
+            middlegame += sign * weight_middlegame * (count - typical)
+            endgame += sign * weight_endgame * (count - typical)
+    return middlegame, endgame
+
+
+class Evaluator:
+    def __init__(self, pawn_cache_size=1 << 16, mobility=True):
+        self.pawn_cache = {}  # pawn hash -> (middlegame, endgame)
+        self.pawn_cache_size = pawn_cache_size
+        self.mobility = mobility
+        self.evaluations = 0
+        self.pawn_probes = 0
+        self.pawn_hits = 0
+
+    def pawn_structure(self, board):
+        self.pawn_probes += 1
+        terms = self.pawn_cache.get(board.pawn_hash)
+        if terms is not None:
+            self.pawn_hits += 1
+            return terms
+        if len(self.pawn_cache) >= self.pawn_cache_size:
+            self.pawn_cache.clear()
+        terms = self.pawn_cache[board.pawn_hash] = pawn_terms(board)
+        return terms
+
+    def evaluate(self, board):
+        """Score in centipawns from the point of view of the side to move"""
+        self.evaluations += 1
+        middlegame = board.middlegame_score
+        endgame = board.endgame_score
+        pawn_middlegame, pawn_endgame = self.pawn_structure(board)
+        middlegame += pawn_middlegame
+        endgame += pawn_endgame
+        if self.mobility:
+            mobility_middlegame, mobility_endgame = mobility_terms(board)
+            middlegame += mobility_middlegame
+            endgame += mobility_endgame
+        # Taper from the middlegame to the endgame score as pieces come off
+        phase = min(board.phase, piece_square.MAX_PHASE)
+        score = (middlegame * phase + endgame * (piece_square.MAX_PHASE - phase)) // piece_square.MAX_PHASE
+        return score if board.turn == "white" else -score
+
+    def pawn_hit_rate(self):
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+
+def sample_positions(count=200, seed=1, max_plies=60):
+    # Boards reached by random games, a spread of openings, middlegames and endings
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board, rules = chess.new_game()
+        for _ in range(rng.randint(0, max_plies)):
+            moves = rules.legal_moves(board.turn)
+            if not moves:
+                break
+            board.make_move(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+
+def benchmark(seconds=2.0, positions=200):
+    """Print evaluations per second with and without mobility and check that the
+    incremental sums match a full rescan. Returns the evaluations per second."""
+    boards = sample_positions(positions)
+    mismatches = sum(1 for board in boards
+                     if full_scores(board) != (board.middlegame_score, board.endgame_score,
+                                               board.phase, board.pawn_hash))
+    print(f"{len(boards)} positions, {mismatches} incremental score mismatches")
+
+    rates = {}
+    for label, evaluator in (("full", Evaluator()), ("no mobility", Evaluator(mobility=False))):
+        start = time.perf_counter()
+        deadline = start + seconds / 2
+        while time.perf_counter() < deadline:
+            for board in boards:
+                evaluator.evaluate(board)
+        elapsed = time.perf_counter() - start
+        rates[label] = evaluator.evaluations / elapsed
+        print(f"{label}: {rates[label]:,.0f} evals/s, pawn cache hit rate {evaluator.pawn_hit_rate():.1%}")
+
+    # For comparison, rescanning every piece for material and piece-square terms only
+    start = time.perf_counter()
+    scans = 0
+    while time.perf_counter() < start + seconds / 4:
+        for board in boards:
+            full_scores(board)
+        scans += len(boards)
+    print(f"full board rescan (material + tables only): {scans / (time.perf_counter() - start):,.0f} /s")
+    return rates["full"]
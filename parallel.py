@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Parallel analysis by root splitting: the root moves are dealt out to worker processes,
+# each searches its share with its own Engine and table, the best score wins.
+
+import multiprocessing
+import time
+
+import chess
+import engine
+from transposition import TranspositionTable
+
+
+def _search_share(job):
+    """Worker: iterative deepening over a subset of the root moves.
+    Returns (score, move code, nodes)."""
+    fen, codes, depth, hash_mb = job
+    board, rules = chess.new_game(fen)
+    searcher = engine.Engine(board, rules, TranspositionTable(hash_mb))
+    searcher.table.new_search()
+    moves = [chess.Move.decode(code) for code in codes]
+    best_move = moves[0]
+    for current in range(1, depth + 1):
+        score, best_move = searcher.search_root(moves, current, best_move)
+        if abs(score) >= engine.MATE - depth:
+            break
+    return score, best_move.encode(), searcher.nodes
+
+
+def split_moves(board, rules, threads):
+    # Deal the ordered root moves round-robin so every worker gets some of the likely best ones
+    searcher = engine.Engine(board, rules, TranspositionTable(1))
+    moves = searcher.order_moves(rules.legal_moves(board.turn), 0)
+    shares = [moves[i::threads] for i in range(threads)]
+    return [share for share in shares if share]
+
+
+def parallel_search(fen=None, depth=4, threads=2, hash_mb=16, pool=None):
+    """Best move at a fixed depth using threads processes.
+    Returns (move, score, nodes) with move None if there is no legal move."""
+    if depth < 1 or threads < 1:
+        raise ValueError("depth and threads must be at least 1")
+    board, rules = chess.new_game(fen)
+    fen = board.to_fen()
+    shares = split_moves(board, rules, threads)
+    if not shares:
+        return None, 0, 0
+    jobs = [(fen, [move.encode() for move in share], depth, max(1, hash_mb // threads)) for share in shares]
+    if threads <= 1:
+        results = list(map(_search_share, jobs))
+    elif pool is not None:
+        results = pool.map(_search_share, jobs)
+    else:
+        with multiprocessing.Pool(threads) as pool:
+            results = pool.map(_search_share, jobs)
+    score, code, _ = max(results, key=lambda result: result[0])
+    return chess.Move.decode(code), score, sum(result[2] for result in results)
+
+
+def single_search(fen=None, depth=4, hash_mb=16):
+    """The same fixed-depth search on one core with the regular Engine"""
+    board, rules = chess.new_game(fen)
+    searcher = engine.Engine(board, rules, TranspositionTable(hash_mb))
+    move = searcher.search(max_depth=depth)
+    return move, searcher.nodes
+
+
+def compare(fen=None, depth=4, threads=2, hash_mb=16):
+    """Print single-core and parallel times at a fixed depth and the speedup"""
+    start = time.perf_counter()
+    single_move, single_nodes = single_search(fen, depth, hash_mb)
+    single_time = time.perf_counter() - start
+    print(f"1 core:    {single_move!r} {single_nodes} nodes in {single_time:.2f}s")
+
+    with multiprocessing.Pool(threads) as pool:
+        start = time.perf_counter()
+        move, score, nodes = parallel_search(fen, depth, threads, hash_mb, pool)
+        elapsed = time.perf_counter() - start
+    print(f"{threads} workers: {move!r} score {score} {nodes} nodes in {elapsed:.2f}s")
+    print(f"Speedup {single_time / max(elapsed, 1e-9):.2f}x "
+          f"(on {multiprocessing.cpu_count()} CPUs, {nodes / max(single_nodes, 1):.2f}x the nodes)")
+    return single_time / max(elapsed, 1e-9)
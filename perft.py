@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Perft: count the leaf nodes of the legal move tree to a fixed depth.
+# The counts are compared with published values to prove the move generator,
+# and nodes/second gives a repeatable benchmark for performance changes.
+
+import time
+
+import chess
+
+# (name, FEN, known node counts for depth 1, 2, 3, ...)
+PERFT_SUITE = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(board, rules, depth):
+    if depth <= 0:
+        return 1
+    moves = rules.legal_moves(board.turn)
+    # Bulk counting: the last ply only needs the number of legal moves
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, rules, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, rules, depth):
+    """Return (move, node count) for every legal root move"""
+    results = []
+    for move in rules.legal_moves(board.turn):
+        board.make_move(move)
+        results.append((move, perft(board, rules, depth - 1)))
+        board.unmake_move()
+    return results
+
+
+def report(depth, fen=None, use_bitboard=False):
+    board, rules = chess.new_game(fen, use_bitboard)
+    start = time.perf_counter()
+    results = divide(board, rules, depth)
+    elapsed = time.perf_counter() - start
+
+    for move, nodes in sorted(results, key=lambda result: repr(result[0])):
+        print(f"{move!r}: {nodes}")
+    total = sum(nodes for _, nodes in results)
+    print(f"\nNodes searched: {total}")
+    print(f"Time: {elapsed:.3f}s ({total / max(elapsed, 1e-9):,.0f} nodes/s)")
+    return total
+
+
+def run_suite(max_depth=3, use_bitboard=False):
+    """Run every suite position up to max_depth plies, return True if all counts match"""
+    passed = True
+    total_nodes = 0
+    start = time.perf_counter()
+    for name, fen, counts in PERFT_SUITE:
+        for depth, expected in enumerate(counts[:max_depth], start=1):
+            board, rules = chess.new_game(fen, use_bitboard)
+            nodes = perft(board, rules, depth)
+            total_nodes += nodes
+            status = "ok" if nodes == expected else "FAIL"
+            if nodes != expected:
+                passed = False
+            print(f"{name:<10} depth {depth}: {nodes:>10} (expected {expected:>10}) {status}")
+    elapsed = time.perf_counter() - start
+    print(f"\n{total_nodes} nodes in {elapsed:.3f}s ({total_nodes / max(elapsed, 1e-9):,.0f} nodes/s)")
+    print("All perft counts match." if passed else "Perft counts do not match!")
+    return passed
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# SAN moves and PGN games for chess.py: parse, replay and validate large archives.
+
+import mmap
+import os
+import re
+import time
+
+import chess
+from workers import imap_bounded
+
+SAN_PATTERN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+HEADER_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+
+
+class Game:
+    def __init__(self, headers=None, moves=None, result="*"):
+        self.headers = headers if headers is not None else {}
+        self.moves = moves if moves is not None else []  # SAN strings
+        self.result = result
+
+    def __repr__(self):
+        white = self.headers.get("White", "?")
+        black = self.headers.get("Black", "?")
+        return f"{white} - {black} ({len(self.moves)} plies, {self.result})"
+
+
+def parse_san(rules, san):
+    """Return the legal Move written as san in the current position, or raise ValueError"""
+    board = rules.position
+    token = san.rstrip("+#!?")
+    legal = rules.legal_moves(board.turn)
+
+    if token in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        row = 7 if board.turn == "white" else 0
+        move = chess.Move((row, 4), (row, 6 if len(token) == 3 else 2))
+        king = board.board[row][4]
+        if isinstance(king, chess.King) and move in legal:
+            return move
+        raise ValueError(f"Illegal castling: {san}")
+
+    match = SAN_PATTERN.match(token)
+    if match is None:
+        raise ValueError(f"Not a SAN move: {san}")
+    letter, from_file, from_rank, _, square, promotion = match.groups()
+    letter = letter or "P"
+    to_pos = chess.user_to_matrix(square)
+    promotion = promotion.lower() if promotion else None
+
+    candidates = []
+    for move in legal:
+        if move.to_pos != to_pos or move.promotion != promotion:
+            continue
+        y, x = move.from_pos
+        if board.board[y][x].symbol()[1] != letter:
+            continue
+        if from_file is not None and "abcdefgh"[x] != from_file:
+            continue
+        if from_rank is not None and str(8 - y) != from_rank:
+            continue
+        candidates.append(move)
+
+    if not candidates:
+        raise ValueError(f"Illegal move: {san}")
+    if len(candidates) > 1:
+        raise ValueError(f"Ambiguous move: {san}")
+    return candidates[0]
+
+
+def move_to_san(rules, move):
+    """Write a legal move in SAN for the current position"""
+    board = rules.position
+    y1, x1 = move.from_pos
+    y2, x2 = move.to_pos
+    piece = board.board[y1][x1]
+    letter = piece.symbol()[1]
+
+    if letter == "K" and abs(x2 - x1) == 2:
+        san = "O-O" if x2 == 6 else "O-O-O"
+    else:
+        capture = board.board[y2][x2] is not None or (letter == "P" and x1 != x2)
+        san = ""
+        if letter == "P":
+            if capture:
+                san = "abcdefgh"[x1]
+        else:
+            san = letter
+            # Disambiguate from other pieces of the same kind that reach the square
+            others = [other.from_pos for other in rules.legal_moves(board.turn)
+                      if other.to_pos == move.to_pos and other.from_pos != move.from_pos and
+                      board.board[other.from_pos[0]][other.from_pos[1]].symbol()[1] == letter]
+            if others:
+                if all(x != x1 for _, x in others):
+                    san += "abcdefgh"[x1]
+                elif all(y != y1 for y, _ in others):
+                    san += str(8 - y1)
+                else:
+                    san += chess.matrix_to_user(move.from_pos)
+        if capture:
+            san += "x"
+        san += chess.matrix_to_user(move.to_pos)
+        if move.promotion:
+            san += "=" + move.promotion.upper()
+
+    board.make_move(move)
+    if rules.is_in_check(board.turn):
+        san += "+" if rules.has_legal_moves(board.turn) else "#"
+    board.unmake_move()
+    return san
+
+
+def format_game(game):
+    """PGN text of a game: headers, numbered SAN movetext wrapped at 80 columns, result"""
+    headers = dict(game.headers)
+    headers["Result"] = game.result
+    lines = [f'[{key} "{value}"]' for key, value in headers.items()]
+    # Move numbering continues from the side to move and move number of the start position
+    fields = headers.get("FEN", "- w - - 0 1").split()
+    white = fields[1] == "w"
+    number = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for ply, san in enumerate(game.moves):
+        if white:
+            tokens.append(f"{number}.")
+        elif ply == 0:
+            tokens.append(f"{number}...")
+        tokens.append(san)
+        if not white:
+            number += 1
+        white = not white
+    tokens.append(game.result)
+
+    movetext = []
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            movetext.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    movetext.append(line)
+    return "\n".join(lines) + "\n\n" + "\n".join(movetext) + "\n\n"
+
+
+def _tokens(text):
+    # Split movetext, dropping comments, variations, NAGs (also !? written apart from
+    # the move) and move numbers
+    text = re.sub(r"\{[^}]*\}|;[^\n]*", " ", text)
+    depth = 0
+    for token in re.findall(r"\(|\)|[^\s()]+", text):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and not token.startswith("$") and token.strip("!?"):
+            token = re.sub(r"^\d+\.+", "", token)
+            if token:
+                yield token
+
+
+def _parse_game(headers, movetext):
+    game = Game(headers, result=headers.get("Result", "*"))
+    # Keep the line breaks, a ; comment only runs to the end of its line
+    for token in _tokens("\n".join(movetext)):
+        if token in RESULTS:
+            game.result = token
+        else:
+            game.moves.append(token)
+    return game
+
+
+def _lines(path, use_mmap):
+    if use_mmap:
+        with open(path, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                return  # Empty files cannot be mapped
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b""):
+                    yield line.decode("utf-8", "replace")
+    else:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            yield from handle
+
+
+def read_games(path, use_mmap=False):
+    """Yield the games of a PGN file one at a time"""
+    headers = {}
+    movetext = []
+    for line in _lines(path, use_mmap):
+        line = line.strip()
+        match = HEADER_PATTERN.match(line)
+        if match:
+            # A header after movetext starts the next game
+            if movetext:
+                yield _parse_game(headers, movetext)
+                headers, movetext = {}, []
+            headers[match.group(1)] = match.group(2)
+        elif line and not line.startswith("%"):
+            movetext.append(line)
+    if headers or movetext:
+        yield _parse_game(headers, movetext)
+
+
+def replay(game, use_bitboard=False):
+    """Play a game through Board/CheckMate.
+    Returns (plies played, error message or None)."""
+    try:
+        board, rules = chess.new_game(game.headers.get("FEN"), use_bitboard)
+    except ValueError as error:
+        return 0, str(error)
+    for ply, san in enumerate(game.moves):
+        try:
+            move = parse_san(rules, san)
+        except ValueError as error:
+            number = board.fullmove_number
+            dots = "." if board.turn == "white" else "..."
+            return ply, f"{number}{dots} {error}"
+        board.make_move(move)
+    return len(game.moves), None
+
+
+def _replay_job(game):
+    return repr(game), replay(game)
+
+
+def validate(path, workers=1, use_mmap=False, verbose=True):
+    """Replay every game of a PGN file, printing the illegal ones.
+    Returns (games, illegal games, plies)."""
+    start = time.perf_counter()
+    games = illegal = plies = 0
+
+    for name, (played, error) in imap_bounded(_replay_job, read_games(path, use_mmap), workers):
+        games += 1
+        plies += played
+        if error is not None:
+            illegal += 1
+            if verbose:
+                print(f"Game {games} {name}: {error}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{games} games, {plies} plies, {illegal} with illegal moves in {elapsed:.2f}s "
+          f"({games / max(elapsed, 1e-9):,.1f} games/s, {plies / max(elapsed, 1e-9):,.0f} plies/s)")
+    return games, illegal, plies
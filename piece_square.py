@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Piece values and piece-square tables for the middlegame and the endgame, from white's side
+# (first row is rank 8). chess.Board keeps their sums incrementally as pieces are put and
+# removed, evaluation.py tapers them by the game phase. No imports, so both can use it.
+
+MIDDLEGAME_VALUES = {"P": 82, "N": 337, "B": 365, "R": 477, "Q": 1025, "K": 0}
+ENDGAME_VALUES = {"P": 94, "N": 281, "B": 297, "R": 512, "Q": 936, "K": 0}
+PHASE_WEIGHTS = {"P": 0, "N": 1, "B": 1, "R": 2, "Q": 4, "K": 0}
+MAX_PHASE = 24  # both sides with all their pieces
+_PAWN_TABLE = [0, 0, 0, 0, 0, 0, 0, 0,
+               50, 50, 50, 50, 50, 50, 50, 50,
+               10, 10, 20, 30, 30, 20, 10, 10,
+               5, 5, 10, 25, 25, 10, 5, 5,
+               0, 0, 0, 20, 20, 0, 0, 0,
+               5, -5, -10, 0, 0, -10, -5, 5,
+               5, 10, 10, -20, -20, 10, 10, 5,
+               0, 0, 0, 0, 0, 0, 0, 0]
+_PAWN_ENDGAME_TABLE = [0, 0, 0, 0, 0, 0, 0, 0,
+                       80, 80, 80, 80, 80, 80, 80, 80,
+                       50, 50, 50, 50, 50, 50, 50, 50,
+                       30, 30, 30, 30, 30, 30, 30, 30,
+                       15, 15, 15, 15, 15, 15, 15, 15,
+                       5, 5, 5, 5, 5, 5, 5, 5,
+                       0, 0, 0, 0, 0, 0, 0, 0,
+                       0, 0, 0, 0, 0, 0, 0, 0]
+_KNIGHT_TABLE = [-50, -40, -30, -30, -30, -30, -40, -50,
+                 -40, -20, 0, 0, 0, 0, -20, -40,
+                 -30, 0, 10, 15, 15, 10, 0, -30,
+                 -30, 5, 15, 20, 20, 15, 5, -30,
+                 -30, 0, 15, 20, 20, 15, 0, -30,
+                 -30, 5, 10, 15, 15, 10, 5, -30,
+                 -40, -20, 0, 5, 5, 0, -20, -40,
+                 -50, -40, -30, -30, -30, -30, -40, -50]
+_BISHOP_TABLE = [-20, -10, -10, -10, -10, -10, -10, -20,
+                 -10, 0, 0, 0, 0, 0, 0, -10,
+                 -10, 0, 5, 10, 10, 5, 0, -10,
+                 -10, 5, 5, 10, 10, 5, 5, -10,
+                 -10, 0, 10, 10, 10, 10, 0, -10,
+                 -10, 10, 10, 10, 10, 10, 10, -10,
+                 -10, 5, 0, 0, 0, 0, 5, -10,
+                 -20, -10, -10, -10, -10, -10, -10, -20]
+_ROOK_TABLE = [0, 0, 0, 0, 0, 0, 0, 0,
+               5, 10, 10, 10, 10, 10, 10, 5,
+               -5, 0, 0, 0, 0, 0, 0, -5,
+               -5, 0, 0, 0, 0, 0, 0, -5,
+               -5, 0, 0, 0, 0, 0, 0, -5,
+               -5, 0, 0, 0, 0, 0, 0, -5,
+               -5, 0, 0, 0, 0, 0, 0, -5,
+               0, 0, 0, 5, 5, 0, 0, 0]
+_QUEEN_TABLE = [-20, -10, -10, -5, -5, -10, -10, -20,
+                -10, 0, 0, 0, 0, 0, 0, -10,
+                -10, 0, 5, 5, 5, 5, 0, -10,
+                -5, 0, 5, 5, 5, 5, 0, -5,
+                0, 0, 5, 5, 5, 5, 0, -5,
+                -10, 5, 5, 5, 5, 5, 0, -10,
+                -10, 0, 5, 0, 0, 0, 0, -10,
+                -20, -10, -10, -5, -5, -10, -10, -20]
+_KING_TABLE = [-30, -40, -40, -50, -50, -40, -40, -30,
+               -30, -40, -40, -50, -50, -40, -40, -30,
+               -30, -40, -40, -50, -50, -40, -40, -30,
+               -30, -40, -40, -50, -50, -40, -40, -30,
+               -20, -30, -30, -40, -40, -30, -30, -20,
+               -10, -20, -20, -20, -20, -20, -20, -10,
+               20, 20, 0, 0, 0, 0, 20, 20,
+               20, 30, 10, 0, 0, 10, 30, 20]
+_KING_ENDGAME_TABLE = [-50, -40, -30, -20, -20, -30, -40, -50,
+                       -30, -20, -10, 0, 0, -10, -20, -30,
+                       -30, -10, 20, 30, 30, 20, -10, -30,
+                       -30, -10, 30, 40, 40, 30, -10, -30,
+                       -30, -10, 30, 40, 40, 30, -10, -30,
+                       -30, -10, 20, 30, 30, 20, -10, -30,
+                       -30, -30, 0, 0, 0, 0, -30, -30,
+                       -50, -30, -30, -30, -30, -30, -30, -50]
+_MIDDLEGAME_TABLES = {"P": _PAWN_TABLE, "N": _KNIGHT_TABLE, "B": _BISHOP_TABLE, "R": _ROOK_TABLE,
+                      "Q": _QUEEN_TABLE, "K": _KING_TABLE}
+_ENDGAME_TABLES = dict(_MIDDLEGAME_TABLES, P=_PAWN_ENDGAME_TABLE, K=_KING_ENDGAME_TABLE)
+
+
+def _signed_tables(values, tables):
+    # value + table per symbol and square, mirrored and negated for black
+    signed = {}
+    for kind, table in tables.items():
+        signed["w" + kind] = [values[kind] + table[square] for square in range(64)]
+        signed["b" + kind] = [-(values[kind] + table[(7 - square // 8) * 8 + square % 8]) for square in range(64)]
+    return signed
+
+
+MIDDLEGAME_SCORES = _signed_tables(MIDDLEGAME_VALUES, _MIDDLEGAME_TABLES)
+ENDGAME_SCORES = _signed_tables(ENDGAME_VALUES, _ENDGAME_TABLES)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# Asyncio game server for the chess.py rules.
+# Protocol: one JSON object per line in each direction, e.g.
+#   {"cmd": "new", "time": 300, "increment": 2}      -> {"ok": true, "game": "1", ...}
+#   {"cmd": "move", "game": "1", "move": "e2e4"}     -> {"ok": true, "fen": ..., "status": "playing"}
+#   {"cmd": "engine", "game": "1", "movetime": 0.5}  -> engine plays for the side to move
+#   {"cmd": "state" | "legal" | "resign" | "close", "game": "1"}
+# Moves can be coordinates (e2e4, e7e8q) or SAN (Nf3, O-O).
+# Rules and engine work run in a process pool, so a busy game never blocks the event loop.
+
+import asyncio
+import json
+import math
+import re
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+COORDINATE_MOVE = re.compile(r"^([a-h][1-8])([a-h][1-8])([qrbn])?$")
+
+
+def _replay(start, moves):
+    # start is a Position.to_bytes() record, moves are Move.encode() codes,
+    # both already validated when the game was created or the moves played
+    board = chess.Board.from_snapshot(chess.Position.from_bytes(start))
+    rules = chess.CheckMate(board)
+    for code in moves:
+        board.make_move(chess.Move.decode(code))
+    return board, rules
+
+
+def _parse_move(rules, text):
+    match = COORDINATE_MOVE.match(text)
+    if match:
+        move = chess.Move(chess.user_to_matrix(match.group(1)), chess.user_to_matrix(match.group(2)),
+                          match.group(3))
+        if move in rules.legal_moves(rules.position.turn):
+            return move
+        raise ValueError(f"Illegal move: {text}")
+    import pgn
+    return pgn.parse_san(rules, text)
+
+
+def apply_move(start, moves, text):
+    """Worker job: validate and play text after moves, return the new game state"""
+    board, rules = _replay(start, moves)
+    move = _parse_move(rules, text)
+    board.make_move(move)
+    status, result = rules.game_status()
+    return {"move": repr(move), "code": move.encode(), "position": board.snapshot().to_bytes(), "status": status, "result": result,
+            "in_check": rules.is_in_check(board.turn)}
+
+
+def engine_move(start, moves, movetime, hash_mb):
+    """Worker job: search the position for at most movetime seconds, return the move"""
+    import engine
+    from transposition import TranspositionTable
+    board, rules = _replay(start, moves)
+    move = engine.Engine(board, rules, TranspositionTable(hash_mb)).search(time_limit=movetime)
+    return repr(move)
+
+
+def legal_moves(start, moves):
+    board, rules = _replay(start, moves)
+    return [repr(move) for move in rules.legal_moves(board.turn)]
+
+
+class GameSession:
+    def __init__(self, game_id, fen=None, base_time=None, increment=0.0):
+        board, rules = chess.new_game(fen)
+        self.id = game_id
+        # Position.to_bytes() records (70 bytes) of the start and current positions,
+        # the jobs rebuild boards from the start record and the move codes
+        self.start = board.snapshot().to_bytes()
+        self.position = self.start
+        self.turn = board.turn
+        self.moves = array("H")  # Move.encode() codes, 2 bytes per ply
+        # A FEN can already be mate, stalemate or a fifty-move draw
+        self.status, self.result = rules.game_status()
+        self.increment = increment
+        # Remaining seconds per side, None for untimed games
+        self.clock = {"white": base_time, "black": base_time}
+        self.turn_started = time.monotonic()
+        self.lock = asyncio.Lock()  # One move at a time per game
+
+    def remaining(self, color):
+        left = self.clock[color]
+        if left is None:
+            return None
+        if color == self.turn and self.status == "playing":
+            left -= time.monotonic() - self.turn_started
+        return max(left, 0.0)
+
+    def check_flag(self):
+        # The side to move loses on time once its clock runs out
+        if self.status == "playing" and self.remaining(self.turn) == 0.0:
+            self.status = "time"
+            self.result = "0-1" if self.turn == "white" else "1-0"
+        return self.status == "time"
+
+    def state(self):
+        self.check_flag()
+        fen = chess.Board.from_snapshot(chess.Position.from_bytes(self.position)).to_fen()
+        return {"ok": True, "game": self.id, "fen": fen, "turn": self.turn,
+                "moves": [repr(chess.Move.decode(code)) for code in self.moves],
+                "status": self.status, "result": self.result,
+                "clock": {color: self.remaining(color) for color in ("white", "black")}}
+
+
+class ChessServer:
+    def __init__(self, workers=None, hash_mb=16):
+        self.games = {}
+        self.next_id = 1
+        self.hash_mb = hash_mb
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    async def run_job(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    def get_game(self, request):
+        game = self.games.get(str(request.get("game")))
+        if game is None:
+            raise ValueError(f"Unknown game: {request.get('game')}")
+        return game
+
+    async def play(self, game, text):
+        async with game.lock:
+            if game.check_flag() or game.status != "playing":
+                raise ValueError(f"Game is over: {game.status}")
+            state = await self.run_job(apply_move, game.start, game.moves, text)
+
+            mover = game.turn
+            if game.clock[mover] is not None:
+                game.clock[mover] = game.remaining(mover) + game.increment
+            game.moves.append(state["code"])
+            game.position = state["position"]
+            game.turn = "black" if mover == "white" else "white"
+            game.status = state["status"]
+            game.result = state["result"]
+            game.turn_started = time.monotonic()
+            return {**game.state(), "move": state["move"], "in_check": state["in_check"]}
+
+    async def handle_request(self, request):
+        command = request.get("cmd")
+        if command == "new":
+            base_time = request.get("time")
+            if base_time is not None:
+                base_time = float(base_time)
+            increment = float(request.get("increment", 0))
+            for value in (base_time or 0.0, increment):
+                if not math.isfinite(value) or value < 0:
+                    raise ValueError(f"Invalid clock setting: {value}")
+            # The session is built before taking an id, so a bad request registers nothing
+            game = GameSession(str(self.next_id), request.get("fen"), base_time, increment)
+            self.games[game.id] = game
+            self.next_id += 1
+            return game.state()
+        if command == "state":
+            return self.get_game(request).state()
+        if command == "legal":
+            game = self.get_game(request)
+            return {"ok": True, "game": game.id,
+                    "legal_moves": await self.run_job(legal_moves, game.start, game.moves)}
+        if command == "move":
+            return await self.play(self.get_game(request), str(request.get("move", "")))
+        if command == "engine":
+            game = self.get_game(request)
+            if game.check_flag() or game.status != "playing":
+                raise ValueError(f"Game is over: {game.status}")
+            movetime = float(request.get("movetime", 1.0))
+            if game.remaining(game.turn) is not None:
+                movetime = min(movetime, game.remaining(game.turn) / 2)
+            move = await self.run_job(engine_move, game.start, game.moves, movetime, self.hash_mb)
+            return await self.play(game, move)
+        if command == "resign":
+            game = self.get_game(request)
+            async with game.lock:
+                if game.status == "playing":
+                    game.status = "resigned"
+                    game.result = "0-1" if game.turn == "white" else "1-0"
+            return game.state()
+        if command == "close":
+            game = self.games.pop(str(request.get("game")), None)
+            return {"ok": game is not None}
+        raise ValueError(f"Unknown command: {command}")
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except (ValueError, TypeError, AttributeError) as error:
+                    response = {"ok": False, "error": str(error)}
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Chess server listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+
+def serve(host="127.0.0.1", port=8765, workers=None, hash_mb=16):
+    try:
+        asyncio.run(ChessServer(workers, hash_mb).serve(host, port))
+    except KeyboardInterrupt:
+        print("Server stopped.")
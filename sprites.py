@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Board and piece images scaled once per size and kept on disk as PNG files,
+# so later launches load them straight into tk.PhotoImage without PIL.
+# The board only comes in the BOARD_SIZES, which keeps the cache to a few files per image.
+
+import os
+import tkinter as tk
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pieces")
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sprite_cache")
+PIECE_NAMES = ["wR", "wN", "wB", "wQ", "wK", "wP", "bR", "bN", "bB", "bQ", "bK", "bP"]
+BOARD_SIZES = [256, 384, 512, 640, 768, 896, 1024, 1280]
+
+
+def snap(size):
+    """The largest board size that fits in size pixels, the smallest one if none does"""
+    return max((board_size for board_size in BOARD_SIZES if board_size <= size), default=BOARD_SIZES[0])
+
+
+def cached_path(name, size):
+    # The source mtime and byte size are part of the name, an edited image gets a new file
+    stat = os.stat(os.path.join(SOURCE_DIR, f"{name}.png"))
+    return os.path.join(CACHE_DIR, f"{name}-{size}-{stat.st_mtime_ns}-{stat.st_size}.png")
+
+
+def render(name, size, path):
+    """Scale pieces/<name>.png to size x size and save it as path"""
+    from PIL import Image  # Only needed on a cache miss
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with Image.open(os.path.join(SOURCE_DIR, f"{name}.png")) as image:
+        scaled = image.convert("RGBA").resize((size, size), Image.Resampling.LANCZOS)
+    temporary = path + ".tmp"
+    scaled.save(temporary, format="PNG")
+    os.replace(temporary, path)
+
+
+def _images(board_size):
+    # (image name, pixel size) of everything drawn on a board of board_size
+    return [("board", board_size)] + [(name, board_size // 8) for name in PIECE_NAMES]
+
+
+def is_cached(board_size):
+    return all(os.path.exists(cached_path(name, size)) for name, size in _images(board_size))
+
+
+def prune():
+    """Delete renders of edited source images and of sizes outside BOARD_SIZES"""
+    keep = {os.path.basename(cached_path(name, size))
+            for board_size in BOARD_SIZES for name, size in _images(board_size)}
+    for entry in os.listdir(CACHE_DIR):
+        if entry.endswith(".png") and entry not in keep:
+            os.remove(os.path.join(CACHE_DIR, entry))
+
+
+def render_set(board_size):
+    """Render the missing images of a board size. Makes no Tk calls, so it can run
+    on a background thread while the window keeps showing the old size."""
+    missing = [(name, size) for name, size in _images(board_size) if not os.path.exists(cached_path(name, size))]
+    for name, size in missing:
+        render(name, size, cached_path(name, size))
+    if missing:
+        prune()
+
+
+def load_set(board_size):
+    """(board image, {symbol: piece image}) for a board_size x board_size board,
+    board_size being one of BOARD_SIZES"""
+    if not is_cached(board_size):
+        render_set(board_size)
+    images = {name: tk.PhotoImage(file=cached_path(name, size)) for name, size in _images(board_size)}
+    return images.pop("board"), images
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# Endgame tablebases for KQK, KRK and KPK built by retrograde analysis.
+# Each table has one byte per (side to move, strong king, strong piece, weak king):
+#   0 = draw, 1 = impossible position, n >= 2 = decided with distance to mate n - 2 plies,
+#   odd distance: the side to move mates, even distance: the side to move gets mated.
+# The strong side is stored as white, black-strong positions are probed mirrored.
+# File: 8-byte magic followed by the KQK, KRK and KPK tables, read through mmap.
+
+import mmap
+import os
+import random
+import time
+from array import array
+
+import chess
+
+MAGIC = b"CHESSTB1"
+SIGNATURES = ["Q", "R", "P"]  # the strong side's extra piece: KQK, KRK, KPK
+TABLE_SIZE = 2 * 64 * 64 * 64
+DRAW, INVALID = 0, 1
+BLOCKED = 0xFFFF  # remaining-move count of a position that can never be lost
+WHITE, BLACK = 0, 1
+
+
+def index(turn, king, piece, enemy_king):
+    return ((turn * 64 + king) * 64 + piece) * 64 + enemy_king
+
+
+def _steps(square, offsets):
+    y, x = divmod(square, 8)
+    return [(y + dy) * 8 + x + dx for dy, dx in offsets if 0 <= y + dy < 8 and 0 <= x + dx < 8]
+
+
+def _rays(square, directions):
+    y, x = divmod(square, 8)
+    rays = []
+    for dy, dx in directions:
+        ray = []
+        ny, nx = y + dy, x + dx
+        while 0 <= ny < 8 and 0 <= nx < 8:
+            ray.append(ny * 8 + nx)
+            ny += dy
+            nx += dx
+        rays.append(ray)
+    return rays
+
+
+KING_STEPS = [_steps(square, chess.KING_OFFSETS) for square in range(64)]
+ADJACENT = [[max(abs(a // 8 - b // 8), abs(a % 8 - b % 8)) <= 1 for b in range(64)] for a in range(64)]
+RAYS = {"Q": [_rays(square, chess.QUEEN_DIRECTIONS) for square in range(64)],
+        "R": [_rays(square, chess.ROOK_DIRECTIONS) for square in range(64)]}
+# Squares strictly between a slider and a target on one of its lines, None if not on a line
+BETWEEN = {kind: [[None] * 64 for _ in range(64)] for kind in RAYS}
+for _kind, _all_rays in RAYS.items():
+    for _square in range(64):
+        for _ray in _all_rays[_square]:
+            for _i, _target in enumerate(_ray):
+                BETWEEN[_kind][_square][_target] = _ray[:_i]
+# White pawns move towards y = 0, so they attack y - 1
+PAWN_ATTACKS = [_steps(square, [(-1, -1), (-1, 1)]) for square in range(64)]
+
+
+def _attacks(kind, piece, target, blocker):
+    if kind == "P":
+        return target in PAWN_ATTACKS[piece]
+    between = BETWEEN[kind][piece][target]
+    return between is not None and blocker not in between
+
+
+def _is_legal(kind, turn, king, piece, enemy_king):
+    if king == piece or king == enemy_king or piece == enemy_king or ADJACENT[king][enemy_king]:
+        return False
+    if kind == "P" and not 8 <= piece < 56:
+        return False
+    # The side that just moved cannot have left its king attacked
+    return turn == BLACK or not _attacks(kind, piece, enemy_king, king)
+
+
+def _moves(kind, turn, king, piece, enemy_king, tables):
+    """Legal moves as (children indexes, values of moves that leave the table).
+    Those values are table bytes from the opponent's point of view."""
+    children = []
+    outside = []
+    if turn == WHITE:
+        for target in KING_STEPS[king]:
+            if target != piece and not ADJACENT[target][enemy_king]:
+                children.append(index(BLACK, target, piece, enemy_king))
+        if kind == "P":
+            target = piece - 8
+            if target not in (king, enemy_king):
+                if target < 8:
+                    # Promotions continue in KQK / KRK, bishops and knights cannot mate
+                    outside.append(tables["Q"][index(BLACK, king, target, enemy_king)])
+                    outside.append(tables["R"][index(BLACK, king, target, enemy_king)])
+                    outside.extend((DRAW, DRAW))
+                else:
+                    children.append(index(BLACK, king, target, enemy_king))
+                    if piece >= 48 and target - 8 not in (king, enemy_king):
+                        children.append(index(BLACK, king, target - 8, enemy_king))
+        else:
+            for ray in RAYS[kind][piece]:
+                for target in ray:
+                    if target == king or target == enemy_king:
+                        break
+                    children.append(index(BLACK, king, target, enemy_king))
+    else:
+        for target in KING_STEPS[enemy_king]:
+            if ADJACENT[target][king]:
+                continue
+            if target == piece:
+                outside.append(DRAW)  # the lone piece is undefended, K v K
+            elif not _attacks(kind, piece, target, king):
+                children.append(index(WHITE, king, piece, target))
+    return children, outside
+
+
+def _unmoves(kind, position):
+    # Legal positions one move before position (moves inside the table only)
+    turn, rest = divmod(position, 64 * 64 * 64)
+    king, rest = divmod(rest, 64 * 64)
+    piece, enemy_king = divmod(rest, 64)
+    if turn == BLACK:  # white just moved
+        for origin in KING_STEPS[king]:
+            if origin not in (piece, enemy_king) and _is_legal(kind, WHITE, origin, piece, enemy_king):
+                yield index(WHITE, origin, piece, enemy_king)
+        if kind == "P":
+            origin = piece + 8
+            if origin < 56 and origin not in (king, enemy_king):
+                yield index(WHITE, king, origin, enemy_king)
+                if 32 <= piece < 40 and origin + 8 not in (king, enemy_king):
+                    yield index(WHITE, king, origin + 8, enemy_king)
+        else:
+            for ray in RAYS[kind][piece]:
+                for origin in ray:
+                    if origin == king or origin == enemy_king:
+                        break
+                    if _is_legal(kind, WHITE, king, origin, enemy_king):
+                        yield index(WHITE, king, origin, enemy_king)
+    else:  # black just moved its king
+        for origin in KING_STEPS[enemy_king]:
+            if origin not in (king, piece) and not ADJACENT[origin][king]:
+                yield index(BLACK, king, piece, origin)
+
+
+def generate(kind, tables=None):
+    """Solve one table. KPK needs the KQK and KRK tables in tables."""
+    values = bytearray(TABLE_SIZE)
+    remaining = array("H", bytes(2 * TABLE_SIZE))
+    longest = bytearray(TABLE_SIZE)  # longest opponent win among the resolved moves
+    buckets = {}  # distance to mate -> positions that may be resolved with it
+
+    for position in range(TABLE_SIZE):
+        turn, rest = divmod(position, 64 * 64 * 64)
+        king, rest = divmod(rest, 64 * 64)
+        piece, enemy_king = divmod(rest, 64)
+        if not _is_legal(kind, turn, king, piece, enemy_king):
+            values[position] = INVALID
+            continue
+        children, outside = _moves(kind, turn, king, piece, enemy_king, tables)
+        remaining[position] = len(children)
+        all_lost = True  # every move that leaves the table wins for the opponent
+        for value in outside:
+            if value == DRAW:
+                remaining[position] = BLOCKED
+                all_lost = False
+            elif (value - 2) % 2 == 0:  # the opponent gets mated
+                buckets.setdefault(value - 1, []).append(position)
+                all_lost = False
+            else:
+                longest[position] = max(longest[position], value - 2)
+        if remaining[position] == 0:
+            if outside:
+                if all_lost:
+                    buckets.setdefault(longest[position] + 1, []).append(position)
+            elif turn == BLACK and _attacks(kind, piece, enemy_king, king):
+                buckets.setdefault(0, []).append(position)  # checkmate
+            else:
+                remaining[position] = BLOCKED  # stalemate
+
+    distance = 0
+    while buckets:
+        for position in buckets.pop(distance, ()):
+            if values[position] != DRAW:
+                continue
+            values[position] = distance + 2
+            for previous in _unmoves(kind, position):
+                if values[previous] != DRAW:
+                    continue
+                if distance % 2 == 0:
+                    # Moving here mates, the previous position is won
+                    buckets.setdefault(distance + 1, []).append(previous)
+                elif remaining[previous] != BLOCKED:
+                    remaining[previous] -= 1
+                    longest[previous] = max(longest[previous], distance)
+                    if remaining[previous] == 0:
+                        buckets.setdefault(longest[previous] + 1, []).append(previous)
+        distance += 1
+    return values
+
+
+def build(path):
+    """Generate KQK, KRK and KPK and write them to path"""
+    tables = {}
+    for kind in SIGNATURES:
+        start = time.perf_counter()
+        tables[kind] = generate(kind, tables)
+        decided = sum(1 for value in tables[kind] if value >= 2)
+        longest = max(tables[kind]) - 2
+        print(f"K{kind}K: {decided} decided positions, longest mate {longest} plies "
+              f"({time.perf_counter() - start:.1f}s)")
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as output:
+        output.write(MAGIC)
+        for kind in SIGNATURES:
+            output.write(tables[kind])
+    os.replace(temporary, path)
+
+
+class Tablebase:
+    def __init__(self, path):
+        self.handle = open(path, "rb")
+        self.data = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC or len(self.data) != len(MAGIC) + len(SIGNATURES) * TABLE_SIZE:
+            self.close()
+            raise ValueError(f"Not a tablebase file: {path}")
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.handle.close()
+            self.data = None
+
+    def probe(self, board):
+        """("win" | "loss" | "draw", plies to mate) for the side to move,
+        or None when the material is not covered"""
+        white = board.piece_squares["white"]
+        black = board.piece_squares["black"]
+        if len(white) + len(black) == 2:
+            return "draw", 0
+        if len(white) + len(black) != 3:
+            return None
+        strong = "white" if len(white) == 2 else "black"
+        squares = white if strong == "white" else black
+        piece_pos = next(pos for pos in squares if pos != board.king_squares[strong])
+        kind = board.board[piece_pos[0]][piece_pos[1]].symbol()[1]
+        if kind in ("B", "N"):
+            return "draw", 0
+        weak = "black" if strong == "white" else "white"
+
+        def square(pos):
+            # Mirror the ranks when black is the strong side
+            y, x = pos
+            return (y if strong == "white" else 7 - y) * 8 + x
+
+        turn = WHITE if board.turn == strong else BLACK
+        position = index(turn, square(board.king_squares[strong]), square(piece_pos),
+                         square(board.king_squares[weak]))
+        value = self.data[len(MAGIC) + SIGNATURES.index(kind) * TABLE_SIZE + position]
+        if value == INVALID:
+            return None
+        if value == DRAW:
+            return "draw", 0
+        distance = value - 2
+        return ("win" if distance % 2 else "loss"), distance
+
+
+def verify(tablebase, samples=1000, seed=1):
+    """Check random positions against the CheckMate rules: every value must follow
+    from the values after each legal move. Returns the number of mismatches."""
+    rng = random.Random(seed)
+    errors = 0
+    for sample in range(samples):
+        kind = rng.choice(SIGNATURES)
+        board = chess.Board()
+        squares = rng.sample(range(8, 56) if kind == "P" else range(64), 3)
+        pieces = [chess.King("white"), chess.PROMOTION_PIECES.get(kind.lower(), chess.Pawn)("white"),
+                  chess.King("black")]
+        if rng.random() < 0.5:  # black as the strong side
+            pieces = [type(piece)("black" if piece.color == "white" else "white") for piece in pieces]
+        for square, piece in zip(squares, pieces):
+            board.put_piece(square // 8, square % 8, piece)
+        board.turn = rng.choice(["white", "black"])
+        board.set_castling_rights(0)
+        board.reset_history()
+        result = tablebase.probe(board)
+        if result is None:
+            continue  # impossible position
+
+        rules = chess.CheckMate(board)
+        moves = rules.legal_moves(board.turn)
+        replies = []
+        for move in moves:
+            board.make_move(move)
+            replies.append(tablebase.probe(board))
+            board.unmake_move()
+        if not moves:
+            expected = ("loss", 0) if rules.is_in_check(board.turn) else ("draw", 0)
+        elif any(reply[0] == "loss" for reply in replies):
+            expected = ("win", 1 + min(reply[1] for reply in replies if reply[0] == "loss"))
+        elif all(reply[0] == "win" for reply in replies):
+            expected = ("loss", 1 + max(reply[1] for reply in replies))
+        else:
+            expected = ("draw", 0)
+        if result != expected:
+            errors += 1
+            print(f"Mismatch {board.to_fen()}: table {result}, rules {expected}")
+    print(f"{samples} positions checked, {errors} mismatches")
+    return errors
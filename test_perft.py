@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# Regression tests for move generation and make/unmake: python -m unittest test_perft (or pytest)
+
+import contextlib
+import io
+import random
+import unittest
+
+import chess
+import perft
+
+
+class PerftTest(unittest.TestCase):
+    def test_suite_counts_on_both_backends(self):
+        for use_bitboard in (False, True):
+            with self.subTest(use_bitboard=use_bitboard):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertTrue(perft.run_suite(max_depth=2, use_bitboard=use_bitboard))
+
+
+class MakeUnmakeTest(unittest.TestCase):
+    def play_random_game(self, fen, use_bitboard, seed, plies=80):
+        board, rules = chess.new_game(fen, use_bitboard)
+        generator = random.Random(seed)
+        fens = [board.to_fen()]
+        for _ in range(plies):
+            moves = rules.legal_moves(board.turn)
+            if not moves:
+                break
+            board.make_move(generator.choice(moves))
+            self.assertEqual(board.hash, board.compute_hash())
+            fens.append(board.to_fen())
+        # Take every move back, each earlier position has to come back exactly
+        while board.undo_stack:
+            fens.pop()
+            board.unmake_move()
+            self.assertEqual(board.hash, board.compute_hash())
+            self.assertEqual(board.to_fen(), fens[-1])
+
+    def test_random_games_on_both_backends(self):
+        for use_bitboard in (False, True):
+            for seed, (name, fen, _) in enumerate(perft.PERFT_SUITE):
+                with self.subTest(use_bitboard=use_bitboard, position=name):
+                    self.play_random_game(fen, use_bitboard, seed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Regression tests for the PGN reader: python -m unittest test_pgn (or pytest)
+
+import os
+import tempfile
+import unittest
+
+import pgn
+
+RUY_LOPEZ = ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6"]
+
+
+class ReadGamesTest(unittest.TestCase):
+    def read(self, text, use_mmap=False):
+        handle, path = tempfile.mkstemp(suffix=".pgn")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, "w") as output:
+            output.write(text)
+        return list(pgn.read_games(path, use_mmap))
+
+    def test_rest_of_line_comment_keeps_the_next_lines(self):
+        text = '[Event "x"]\n\n1. e4 e5 ; note\n2. Nf3 Nc6 3. Bb5 a6 1-0\n'
+        for use_mmap in (False, True):
+            game, = self.read(text, use_mmap)
+            self.assertEqual(game.moves, RUY_LOPEZ)
+            self.assertEqual(game.result, "1-0")
+
+    def test_brace_comments_variations_and_nags(self):
+        text = ('[Event "x"]\n\n'
+                '1. e4 {best by test; or not} e5 $1 2. Nf3 (2. f4 exf4 (2... d5) 3. Nf3) Nc6 !?\n'
+                '3. Bb5 {a comment\nover two lines} a6 $2 *\n')
+        game, = self.read(text)
+        self.assertEqual(game.moves, RUY_LOPEZ)
+        self.assertEqual(game.result, "*")
+
+    def test_games_replay_without_errors(self):
+        text = ('[Event "one"]\n[Result "1-0"]\n\n1. e4 e5 ; first\n2. Nf3 Nc6 1-0\n\n'
+                '[Event "two"]\n[Result "0-1"]\n\n1. f3 e5 2. g4 Qh4# 0-1\n')
+        games = self.read(text)
+        self.assertEqual([game.headers["Event"] for game in games], ["one", "two"])
+        self.assertEqual([pgn.replay(game) for game in games], [(4, None), (4, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
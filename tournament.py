@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# Headless engine-vs-engine matches: games run in worker processes from a list of
+# openings (each played with both colors), results and PGN are written as games finish,
+# and an SPRT can stop the match as soon as the result is clear.
+
+import json
+import math
+import sys
+import time
+
+import chess
+import engine
+import pgn
+from evaluation import Evaluator
+from transposition import TranspositionTable
+from workers import imap_bounded
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+DEFAULT_CONFIG = {"movetime": 0.1, "depth": 64, "nodes": None, "hash": 16, "mobility": True}
+# CheckMate.game_status names written out for the results and the PGN Termination header
+REASONS = {"repetition": "threefold repetition", "fifty_moves": "fifty-move rule"}
+
+
+def parse_config(spec):
+    """Engine settings from "key=value,..." (movetime, depth, nodes, hash, mobility)"""
+    config = dict(DEFAULT_CONFIG)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        if key not in config:
+            raise ValueError(f"Unknown engine setting: {key}")
+        if key == "movetime":
+            config[key] = float(value)
+        elif key == "mobility":
+            config[key] = value.lower() not in ("0", "false", "no", "off")
+        else:
+            config[key] = int(value)
+    return config
+
+
+def insufficient_material(board):
+    # K v K and K + one minor piece v K cannot be won
+    pieces = [board.board[y][x].symbol()[1] for color in ("white", "black")
+              for y, x in board.piece_squares[color]]
+    return len(pieces) <= 3 and all(kind in "KBN" for kind in pieces)
+
+
+def play_game(job):
+    """Worker: play one game, return a dict with the result from white's side,
+    the reason, the start FEN and the SAN moves"""
+    number, fen, white_config, black_config, max_plies = job
+    board, rules = chess.new_game(fen)
+    players = {}
+    for color, config in (("white", white_config), ("black", black_config)):
+        players[color] = (engine.Engine(board, rules, TranspositionTable(config["hash"]),
+                                        Evaluator(mobility=config["mobility"])), config)
+
+    moves = []
+    while True:
+        status, result = rules.game_status()
+        if status != "playing":
+            reason = REASONS.get(status, status)
+            break
+        if insufficient_material(board):
+            result, reason = "1/2-1/2", "insufficient material"
+            break
+        if len(moves) >= max_plies:
+            result, reason = "1/2-1/2", "move limit"
+            break
+
+        searcher, config = players[board.turn]
+        move = searcher.search(time_limit=config["movetime"], node_limit=config["nodes"],
+                               max_depth=config["depth"])
+        moves.append(pgn.move_to_san(rules, move))
+        board.make_move(move)
+    return {"game": number, "fen": fen, "result": result, "reason": reason, "moves": moves}
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """Log-likelihood ratio of elo1 against elo0 (normal approximation of the
+    trinomial game results, as used by the common GSPRT testers)"""
+    games = wins + draws + losses
+    if games == 0 or wins + draws == 0 or draws + losses == 0:
+        return 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance == 0:
+        return 0.0
+    score0 = 1 / (1 + 10 ** (-elo0 / 400))
+    score1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+
+def elo_difference(wins, draws, losses):
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games if games else 0.5
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def openings_list(path=None):
+    return list(chess.read_fens(path)) if path else [START_FEN]
+
+
+def run_match(config_a, config_b, games=100, openings=None, workers=1, max_plies=300,
+              pgn_path=None, results_path=None, sprt=None, alpha=0.05, beta=0.05):
+    """Play up to games games of engine A against engine B, alternating colors on each
+    opening. sprt is (elo0, elo1) to stop early. Returns (wins, draws, losses) for A."""
+    openings = openings or [START_FEN]
+    jobs = ((number, openings[(number // 2) % len(openings)],
+             config_a if number % 2 == 0 else config_b,
+             config_b if number % 2 == 0 else config_a, max_plies)
+            for number in range(games))
+    lower, upper = math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+    pgn_file = open(pgn_path, "a") if pgn_path else None
+    results_file = open(results_path, "a") if results_path else None
+    wins = draws = losses = 0
+    start = time.perf_counter()
+    try:
+        for game in imap_bounded(play_game, jobs, workers, batch_size=1):
+            a_is_white = game["game"] % 2 == 0
+            if game["result"] == "1/2-1/2":
+                draws += 1
+            elif (game["result"] == "1-0") == a_is_white:
+                wins += 1
+            else:
+                losses += 1
+
+            if results_file is not None:
+                results_file.write(json.dumps({**game, "white": "A" if a_is_white else "B"}) + "\n")
+                results_file.flush()
+            if pgn_file is not None:
+                headers = {"Event": "Engine match", "Round": str(game["game"] + 1),
+                           "White": "A" if a_is_white else "B", "Black": "B" if a_is_white else "A",
+                           "Termination": game["reason"]}
+                if game["fen"] != START_FEN:
+                    headers.update(SetUp="1", FEN=game["fen"])
+                pgn_file.write(pgn.format_game(pgn.Game(headers, game["moves"], game["result"])))
+                pgn_file.flush()
+
+            played = wins + draws + losses
+            line = (f"Game {played}: {game['result']} ({game['reason']}), A: +{wins} ={draws} -{losses}, "
+                    f"Elo {elo_difference(wins, draws, losses):+.0f}")
+            if sprt is not None:
+                llr = sprt_llr(wins, draws, losses, *sprt)
+                line += f", LLR {llr:.2f} [{lower:.2f}, {upper:.2f}]"
+                print(line)
+                if llr >= upper or llr <= lower:
+                    verdict = "H1 accepted (A is stronger)" if llr >= upper else "H0 accepted"
+                    print(f"SPRT stopped after {played} games: {verdict}")
+                    break
+            else:
+                print(line)
+    finally:
+        if pgn_file is not None:
+            pgn_file.close()
+        if results_file is not None:
+            results_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"{wins + draws + losses} games in {elapsed:.1f}s, A scored +{wins} ={draws} -{losses}",
+          file=sys.stderr)
+    return wins, draws, losses
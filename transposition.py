@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Fixed-size transposition table keyed by the Zobrist hash of chess.Board.
+# Entries live in two flat unsigned 64-bit arrays (key, packed data), 16 bytes per
+# slot, instead of a dict of objects, so memory use is exactly what was asked for.
+
+from array import array
+
+import chess
+
+EXACT, LOWER, UPPER = 1, 2, 3
+
+SCORE_OFFSET = 1 << 21  # Scores are stored unsigned in 22 bits
+
+# Packed data layout: move (16 bits) | depth (8) | bound (2) | score (22) | generation (8)
+DEPTH_SHIFT = 16
+BOUND_SHIFT = 24
+SCORE_SHIFT = 26
+GENERATION_SHIFT = 48
+
+ENTRY_BYTES = 16
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16, replacement="depth"):
+        """replacement is "depth" (keep deeper entries of the current search) or "always" """
+        if replacement not in ("depth", "always"):
+            raise ValueError(f"Unknown replacement scheme: {replacement!r}")
+        self.replacement = replacement
+
+        # Round down to a power of two so a slot is found with a mask
+        slots = max(1, size_mb * 1024 * 1024 // ENTRY_BYTES)
+        self.size = 1 << (slots.bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys = array("Q", bytes(8 * self.size))
+        self.data = array("Q", bytes(8 * self.size))
+
+        self.generation = 0
+        self.used = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def new_search(self):
+        # Entries from earlier searches may always be replaced
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self.keys = array("Q", bytes(8 * self.size))
+        self.data = array("Q", bytes(8 * self.size))
+        self.used = self.probes = self.hits = self.stores = self.collisions = 0
+
+    def probe(self, key):
+        """Return (depth, bound, score, move) stored for key, or None"""
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        data = self.data[index]
+        if not data:
+            return None
+        self.hits += 1
+        move = data & 0xFFFF
+        return (data >> DEPTH_SHIFT & 0xFF,
+                data >> BOUND_SHIFT & 3,
+                (data >> SCORE_SHIFT & 0x3FFFFF) - SCORE_OFFSET,
+                chess.Move.decode(move) if move else None)
+
+    def store(self, key, depth, bound, score, move=None):
+        index = key & self.mask
+        old = self.data[index]
+        if old:
+            if self.keys[index] != key:
+                if (self.replacement == "depth" and old >> GENERATION_SHIFT == self.generation and
+                        old >> DEPTH_SHIFT & 0xFF > depth):
+                    return
+                self.collisions += 1
+            elif move is None:
+                # Keep the best move of a previous search of the same position
+                move = old & 0xFFFF or None
+                move = chess.Move.decode(move) if move else None
+        else:
+            self.used += 1
+
+        self.stores += 1
+        self.keys[index] = key
+        self.data[index] = ((move.encode() if move is not None else 0) |
+                            min(max(depth, 0), 0xFF) << DEPTH_SHIFT |
+                            bound << BOUND_SHIFT |
+                            (score + SCORE_OFFSET) << SCORE_SHIFT |
+                            self.generation << GENERATION_SHIFT)
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def fill_ratio(self):
+        return self.used / self.size
+
+    def stats(self):
+        return {"size": self.size, "megabytes": self.size * ENTRY_BYTES / (1024 * 1024),
+                "probes": self.probes, "hits": self.hits, "hit_rate": self.hit_rate(),
+                "stores": self.stores, "collisions": self.collisions, "fill_ratio": self.fill_ratio()}
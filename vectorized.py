@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# Vectorized batch encoding of chess.Board positions with NumPy.
+# A batch of N positions is an N x 8 x 8 int8 array (same (y, x) as Board.board):
+# 0 is empty, 1..6 are white P N B R Q K and -1..-6 the black ones.
+# Attack maps, check status and mobility are computed for the whole batch at once.
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only this module needs it
+    np = None
+
+import chess
+
+PIECE_CODES = {"P": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+CODE_LETTERS = {code: letter for letter, code in PIECE_CODES.items()}
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("vectorized.py needs NumPy (pip install numpy)")
+
+
+class BoardBatch:
+    """N positions: squares (N x 8 x 8 int8), turn (+1 white, -1 black),
+    castling (K=1, Q=2, k=4, q=8 bits), en passant square index (-1 if none)
+    and the halfmove/fullmove clocks"""
+
+    def __init__(self, squares, turn, castling, en_passant, halfmove=None, fullmove=None):
+        self.squares = squares
+        self.turn = turn
+        self.castling = castling
+        self.en_passant = en_passant
+        self.halfmove = halfmove if halfmove is not None else np.zeros(len(squares), dtype=np.int32)
+        self.fullmove = fullmove if fullmove is not None else np.ones(len(squares), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.squares)
+
+    @classmethod
+    def from_boards(cls, boards):
+        _require_numpy()
+        boards = list(boards)
+        squares = np.zeros((len(boards), 8, 8), dtype=np.int8)
+        turn = np.ones(len(boards), dtype=np.int8)
+        castling = np.zeros(len(boards), dtype=np.uint8)
+        en_passant = np.full(len(boards), -1, dtype=np.int8)
+        halfmove = np.zeros(len(boards), dtype=np.int32)
+        fullmove = np.ones(len(boards), dtype=np.int32)
+        for i, board in enumerate(boards):
+            for color, sign in (("white", 1), ("black", -1)):
+                for y, x in board.piece_squares[color]:
+                    squares[i, y, x] = sign * PIECE_CODES[board.board[y][x].symbol()[1]]
+            turn[i] = 1 if board.turn == "white" else -1
+            castling[i] = board.castling_rights()
+            if board.en_passant is not None:
+                en_passant[i] = board.en_passant[0] * 8 + board.en_passant[1]
+            halfmove[i] = board.halfmove_clock
+            fullmove[i] = board.fullmove_number
+        return cls(squares, turn, castling, en_passant, halfmove, fullmove)
+
+    @classmethod
+    def from_fens(cls, fens):
+        return cls.from_boards(chess.Board.from_fen(fen) for fen in fens)
+
+    def to_fens(self):
+        fens = []
+        for i in range(len(self)):
+            rows = []
+            for y in range(8):
+                row = ""
+                empty = 0
+                for x in range(8):
+                    code = int(self.squares[i, y, x])
+                    if code == 0:
+                        empty += 1
+                        continue
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    letter = CODE_LETTERS[abs(code)]
+                    row += letter if code > 0 else letter.lower()
+                if empty:
+                    row += str(empty)
+                rows.append(row)
+            rights = int(self.castling[i])
+            castling = "".join(letter for bit, letter in zip((1, 2, 4, 8), "KQkq") if rights & bit) or "-"
+            ep = int(self.en_passant[i])
+            en_passant = chess.matrix_to_user(divmod(ep, 8)) if ep >= 0 else "-"
+            fens.append(f"{'/'.join(rows)} {'w' if self.turn[i] > 0 else 'b'} {castling} {en_passant} "
+                        f"{int(self.halfmove[i])} {int(self.fullmove[i])}")
+        return fens
+
+    def to_boards(self):
+        return [chess.Board.from_fen(fen) for fen in self.to_fens()]
+
+    def planes(self):
+        """N x 12 uint64 bitboards (white P N B R Q K, then black), bit y * 8 + x"""
+        codes = [1, 2, 3, 4, 5, 6, -1, -2, -3, -4, -5, -6]
+        flat = self.squares.reshape(len(self), 1, 64)
+        bits = flat == np.array(codes, dtype=np.int8).reshape(1, 12, 1)
+        packed = np.packbits(bits, axis=-1, bitorder="little")  # N x 12 x 8 bytes
+        return np.ascontiguousarray(packed).view("<u8").reshape(len(self), 12)
+
+
+def shift(mask, dy, dx):
+    """Move every square of an N x 8 x 8 mask by (dy, dx), dropping what leaves the board"""
+    out = np.zeros_like(mask)
+    out[:, max(dy, 0):8 + min(dy, 0), max(dx, 0):8 + min(dx, 0)] = \
+        mask[:, max(-dy, 0):8 + min(-dy, 0), max(-dx, 0):8 + min(-dx, 0)]
+    return out
+
+
+def _side(batch, sign):
+    # sign is an N-vector or scalar: +1 selects white pieces, -1 black pieces
+    sign = np.asarray(sign, dtype=np.int8).reshape(-1, 1, 1)
+    return batch.squares * sign
+
+
+def _slide(origins, empty, dy, dx):
+    # Squares reached along one direction, stopping at (and including) the first piece
+    ray = shift(origins, dy, dx)
+    reached = ray.copy()
+    for _ in range(6):
+        ray = shift(ray & empty, dy, dx)
+        if not ray.any():
+            break
+        reached |= ray
+    return reached
+
+
+def attack_map(batch, sign):
+    """N x 8 x 8 bool array of the squares attacked by the side with sign (+1/-1 or N-vector)"""
+    _require_numpy()
+    own = _side(batch, sign)
+    empty = batch.squares == 0
+    # Pawns attack towards the opponent: white upwards (dy = -1), black downwards
+    forward = -np.asarray(sign, dtype=np.int8).reshape(-1, 1, 1)
+    pawns = own == PAWN
+    attacks = np.zeros(batch.squares.shape, dtype=bool)
+    for dx in (-1, 1):
+        attacks |= np.where(forward < 0, shift(pawns, -1, dx), shift(pawns, 1, dx))
+
+    knights = own == KNIGHT
+    for dy, dx in chess.KNIGHT_OFFSETS:
+        attacks |= shift(knights, dy, dx)
+    kings = own == KING
+    for dy, dx in chess.KING_OFFSETS:
+        attacks |= shift(kings, dy, dx)
+
+    rooks = (own == ROOK) | (own == QUEEN)
+    bishops = (own == BISHOP) | (own == QUEEN)
+    for dy, dx in chess.ROOK_DIRECTIONS:
+        attacks |= _slide(rooks, empty, dy, dx)
+    for dy, dx in chess.BISHOP_DIRECTIONS:
+        attacks |= _slide(bishops, empty, dy, dx)
+    return attacks
+
+
+def in_check(batch):
+    """N bool array: is the side to move in check"""
+    _require_numpy()
+    opponent_attacks = attack_map(batch, -batch.turn)
+    kings = _side(batch, batch.turn) == KING
+    return (opponent_attacks & kings).any(axis=(1, 2))
+
+
+def mobility(batch, sign=None):
+    """N int array of pseudo-legal move counts (pins, checks, castling and en passant
+    are ignored) for the side with sign, the side to move by default"""
+    _require_numpy()
+    if sign is None:
+        sign = batch.turn
+    own_pieces = _side(batch, sign)
+    own = own_pieces > 0
+    enemy = own_pieces < 0
+    empty = batch.squares == 0
+    targets = ~own
+    count = np.zeros(len(batch), dtype=np.int32)
+
+    def add(mask):
+        nonlocal count
+        count += mask.sum(axis=(1, 2), dtype=np.int32)
+
+    for piece, offsets in ((KNIGHT, chess.KNIGHT_OFFSETS), (KING, chess.KING_OFFSETS)):
+        origins = own_pieces == piece
+        for dy, dx in offsets:
+            add(shift(origins, dy, dx) & targets)
+
+    for pieces, directions in (((ROOK, QUEEN), chess.ROOK_DIRECTIONS), ((BISHOP, QUEEN), chess.BISHOP_DIRECTIONS)):
+        origins = np.isin(own_pieces, pieces)
+        for dy, dx in directions:
+            add(_slide(origins, empty, dy, dx) & targets)
+
+    # Pawns: pushes onto empty squares, double pushes from the start rank, captures
+    white = (np.asarray(sign, dtype=np.int8).reshape(-1, 1, 1) > 0)
+    pawns = own_pieces == PAWN
+    start_rank = np.zeros((1, 8, 8), dtype=bool)
+    start_rank[:, 6, :] = True
+    black_start = np.zeros((1, 8, 8), dtype=bool)
+    black_start[:, 1, :] = True
+    start = np.where(white, start_rank, black_start)
+
+    single = np.where(white, shift(pawns, -1, 0), shift(pawns, 1, 0)) & empty
+    add(single)
+    from_start = pawns & start
+    step = np.where(white, shift(from_start, -1, 0), shift(from_start, 1, 0)) & empty
+    add(np.where(white, shift(step, -1, 0), shift(step, 1, 0)) & empty)
+    for dx in (-1, 1):
+        add(np.where(white, shift(pawns, -1, dx), shift(pawns, 1, dx)) & enemy)
+    return count
+
+
+def verify(boards):
+    """Cross-check the batch check status against CheckMate, return mismatching indexes"""
+    boards = list(boards)
+    checks = in_check(BoardBatch.from_boards(boards))
+    return [i for i, board in enumerate(boards)
+            if bool(checks[i]) != chess.CheckMate(board).is_in_check(board.turn)]
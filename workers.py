@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# Process pool helpers shared by the batch tools
+
+import itertools
+import multiprocessing
+from collections import deque
+
+
+def _run_batch(function, batch):
+    return [function(item) for item in batch]
+
+
+def imap_bounded(function, items, workers=1, batch_size=64):
+    """Like Pool.imap, results come back in input order, but at most a few batches
+    per worker are read ahead, so huge or endless inputs use bounded memory.
+    function must be picklable (a module-level function) when workers > 1."""
+    items = iter(items)
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if batch:
+                pending.append(pool.apply_async(_run_batch, (function, batch)))
+            if pending and (not batch or len(pending) >= 2 * workers):
+                yield from pending.popleft().get()
+            elif not batch:
+                break